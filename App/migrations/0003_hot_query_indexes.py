@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-14 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0002_product_barcode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='business_date',
+            field=models.DateField(blank=True, db_index=True, help_text='Calendar date of the business day this sale belongs to (YYYY-MM-DD). Set by the client at point of sale. Falls back to DATE(timestamp) if absent.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(fields=['-triggered_at'], name='lsa_trig_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['sold_by', '-timestamp'], name='sale_seller_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', '-timestamp'], name='sm_prod_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-14 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0003_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_volatile', False)), fields=['user'], name='product_tracked_user_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-14 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0004_product_tracked_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sale',
+            name='client_uuid',
+            field=models.UUIDField(),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-14 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0005_sale_client_uuid_no_index'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='lowstockalert',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='lowstockalert',
+            constraint=models.UniqueConstraint(condition=models.Q(('acknowledged', False)), fields=('product',), name='lowstockalert_one_active_per_product'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-14 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('App', '0007_sale_saleitem_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lowstockalert',
+            index=models.Index(condition=models.Q(('severity', 'critical')), fields=['product'], name='lsa_critical_prod_idx'),
+        ),
+    ]
@@ -1,8 +1,84 @@
-from decimal import Decimal
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left
+from decimal import ROUND_HALF_UP, Decimal
 from django.conf import settings
-from django.db import models, transaction
+from django.core.cache import cache
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
+
+# Money columns use two decimal places
+CENT = Decimal('0.01')
+
+# Rows per statement for bulk_create / bulk_update calls
+BULK_BATCH = settings.PHARMACY_BULK_BATCH_SIZE
+
+# Advisory-lock namespace ("STCK") for per-product stock locks on PostgreSQL,
+# folded into the high half of each 64-bit key
+PRODUCT_LOCK_NS = 0x5354434B
+
+
+def _lock_products(pks):
+    """
+    Take per-product stock locks for the rest of the current transaction.
+
+    On PostgreSQL these are transaction-scoped advisory locks: much lighter
+    than row locks, and released automatically at commit. Keys are taken in
+    ascending order so concurrent writers cannot deadlock.
+    Returns False on other backends so callers can fall back to row locks.
+
+    Each key is the pk XOR the shifted namespace: one bigint per product,
+    distinct for every bigint pk (the two-int4 form overflowed past 2^31-1).
+    """
+    if connection.vendor != 'postgresql':
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            "SELECT pg_advisory_xact_lock(%s::bigint)",
+            [((PRODUCT_LOCK_NS << 32) ^ pk,) for pk in sorted(pks)]
+        )
+    return True
+
+
+def _refresh_alerts_on_commit(refresh, *args):
+    """
+    Run low-stock alert bookkeeping once the current transaction commits.
+
+    Keeps the stock transaction short. By the time it runs the stock change
+    is committed, so a failure is logged rather than raised: the request
+    still succeeds, and the next stock change refreshes the alert again.
+    """
+    def run():
+        try:
+            refresh(*args)
+        except Exception:
+            logger.exception("Low-stock alert refresh failed after commit")
+
+    transaction.on_commit(run)
+
+
+def uuid7():
+    """
+    Return a time-ordered UUIDv7 (RFC 9562): a 48-bit Unix millisecond
+    timestamp followed by random bits.
+
+    Used for server-generated external_ids, so those inserts land at the end
+    of the unique index like the UUIDv7 values clients are asked to send.
+    The standard library only gains uuid.uuid7() in Python 3.14.
+    """
+    value = (time.time_ns() // 1_000_000 & (1 << 48) - 1) << 80
+    value |= int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 9562 variant
+    return uuid.UUID(int=value)
+
 
 # ============================================================================
 # PRODUCT
@@ -62,6 +138,12 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Tracked (non-volatile) products only: stock deduction and low-stock scans
+            models.Index(fields=['user'], condition=Q(is_volatile=False), name='product_tracked_user_idx'),
+        ]
+
     # ------------------------------------------------------------------------
     # Business logic
     # ------------------------------------------------------------------------
@@ -78,6 +160,36 @@ class Product(models.Model):
             return True
         return self.stock is not None and self.stock >= qty
 
+    def _apply_stock_delta(self, qty_delta, now):
+        """
+        Add qty_delta to this product's stock in the database and return the new value.
+
+        PostgreSQL hands the new value back from the UPDATE itself (RETURNING),
+        so resulting_stock is known without a follow-up SELECT; other backends
+        re-read the column.
+        """
+        if connection.vendor == 'postgresql':
+            qn = connection.ops.quote_name
+            opts = self._meta
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE {table} SET {stock} = COALESCE({stock}, 0) + %s, {updated} = %s "
+                    "WHERE {pk} = %s RETURNING {stock}".format(
+                        table=qn(opts.db_table),
+                        stock=qn(opts.get_field('stock').column),
+                        updated=qn(opts.get_field('updated_at').column),
+                        pk=qn(opts.pk.column),
+                    ),
+                    [qty_delta, now, self.pk]
+                )
+                return cursor.fetchone()[0]
+
+        Product.objects.filter(pk=self.pk).update(
+            stock=Coalesce(F('stock'), 0) + qty_delta,
+            updated_at=now
+        )
+        return Product.objects.values_list('stock', flat=True).get(pk=self.pk)
+
     def adjust_stock(self, qty_delta: int, by_user=None, reason=None, movement_type=None):
         """
         Only applies to TRACKED products.
@@ -90,31 +202,48 @@ class Product(models.Model):
         if qty_delta == 0:
             return
 
-        with transaction.atomic():
-            p = Product.objects.select_for_update().get(pk=self.pk)
-
-            if p.stock is None:
-                p.stock = 0
+        logger.debug("adjust_stock sku=%s delta=%s", self.sku, qty_delta)
 
-            p.stock += qty_delta
-            p.save(update_fields=['stock', 'updated_at'])
+        with transaction.atomic():
+            # Single atomic UPDATE: the database applies the delta, so no row
+            # lock or read-modify-write round-trip is needed. The advisory lock
+            # only orders this write against Sale.finalize() on PostgreSQL.
+            _lock_products([self.pk])
+            now = timezone.now()
+            self.stock = self._apply_stock_delta(qty_delta, now)
+            self.updated_at = now
 
             StockMovement.objects.create(
-                product=p,
+                product=self,
                 delta=qty_delta,
-                resulting_stock=p.stock,
+                resulting_stock=self.stock,
                 performed_by=by_user,
                 reason=reason or ("restock" if qty_delta > 0 else "sale"),
                 movement_type=movement_type or ('RESTOCK' if qty_delta > 0 else 'SALE')
             )
 
-        LowStockAlert.create_or_update_for_product(p)
+        if self.reorder_level is None:
+            return
+
+        # Healthy before and after: the change that last left this product
+        # healthy already cleared its alerts, so there is nothing to tear down
+        if self.stock - qty_delta >= self.reorder_level and self.stock >= self.reorder_level:
+            return
+
+        _refresh_alerts_on_commit(LowStockAlert.create_or_update_for_product, self)
 
 
 # ============================================================================
 # STOCK MOVEMENTS (TRACKED ONLY)
 # ============================================================================
 
+class StockMovementManager(models.Manager):
+    """Joins the product, which __str__ and the movement serializers always read."""
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('product')
+
+
 class StockMovement(models.Model):
     MOVEMENT_TYPE_CHOICES = [
         ('SALE', 'Sale'),
@@ -149,12 +278,22 @@ class StockMovement(models.Model):
 
     timestamp = models.DateTimeField(default=timezone.now)
 
+    objects = StockMovementManager()
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['product', '-timestamp'], name='sm_prod_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.sku}: {self.delta:+d} → {self.resulting_stock}"
 
+    @classmethod
+    def bulk_log(cls, movements):
+        """Insert unsaved StockMovement instances in BULK_BATCH-sized statements."""
+        return cls.objects.bulk_create(movements, batch_size=BULK_BATCH)
+
 
 # ============================================================================
 # SALES
@@ -218,18 +357,114 @@ class Sale(models.Model):
     # Track when this sale record was last modified (for soft-audit purposes)
     updated_at = models.DateTimeField(auto_now=True)
     
-    client_uuid = models.UUIDField(unique=True)
+    # Server-generated trace id; external_id is the idempotency key, so this
+    # column carries no index of its own.
+    client_uuid = models.UUIDField()
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['sold_by', '-timestamp'], name='sale_seller_ts_idx'),
+            # Sales list / cursor pagination order, and the dashboard's day range
+            models.Index(fields=['-timestamp'], name='sale_ts_idx'),
+        ]
 
     def __str__(self):
         return f"Sale #{self.id} ({self.total_amount})"
 
+    @classmethod
+    def ingest(cls, external_id, **fields):
+        """
+        Insert a sale keyed by its client external_id, idempotently.
+
+        Returns (sale, created). A new sale costs a single INSERT; a retried
+        submission hits the unique index on external_id and the already-synced
+        sale is returned instead, with no SELECT-then-INSERT race window.
+        """
+        try:
+            with transaction.atomic():
+                return cls.objects.create(external_id=external_id, **fields), True
+        except IntegrityError:
+            # Only the columns SaleSerializer renders for an already-synced sale
+            existing = cls.objects.filter(external_id=external_id).only(
+                'sold_by', 'total_amount', 'timestamp', 'synced_at', 'business_date'
+            ).first()
+            if existing is None:
+                raise
+            return existing, False
+
     def recalc_total(self):
-        total = sum(item.subtotal for item in self.items.all())
+        total = self.items.aggregate(t=Sum('subtotal'))['t'] or Decimal('0.00')
         self.total_amount = total
-        self.save(update_fields=['total_amount'])
+        self.save(update_fields=['total_amount', 'updated_at'])
+
+    def finalize(self, items):
+        """
+        Deduct stock for all tracked items of this sale in one pass.
+
+        Net deltas are computed per product, every involved product is locked
+        once (ordered by pk so concurrent sales cannot deadlock), and the
+        deltas are applied by the database in one UPDATE per batch plus a
+        single bulk INSERT of StockMovement rows. Volatile products are skipped.
+        Allows negative stock - alerts are refreshed once the transaction commits.
+        """
+        deltas = {}
+        for item in items:
+            deltas[item.product_id] = deltas.get(item.product_id, 0) - int(item.quantity)
+
+        if not deltas:
+            return []
+
+        with transaction.atomic():
+            # The advisory lock only orders this sale against other sales and
+            # adjust_stock(). Writers that skip it (product edits, admin, CSV
+            # import) are kept safe by adding the deltas in SQL, never writing
+            # back absolute values read earlier
+            _lock_products(deltas)
+            now = timezone.now()
+            changed = sorted(pk for pk, delta in deltas.items() if delta)
+            for i in range(0, len(changed), BULK_BATCH):
+                batch = changed[i:i + BULK_BATCH]
+                Product.objects.filter(pk__in=batch, is_volatile=False).update(
+                    stock=Coalesce(F('stock'), 0) + Case(
+                        *[When(pk=pk, then=Value(deltas[pk])) for pk in batch],
+                        output_field=IntegerField()
+                    ),
+                    updated_at=now
+                )
+
+            # The UPDATE row-locks what it changed until commit, so these are
+            # the values the deltas produced. has_open_alert lets
+            # bulk_refresh() skip its own alert lookups
+            products = Product.objects.filter(pk__in=deltas, is_volatile=False).annotate(
+                has_open_alert=Exists(
+                    LowStockAlert.objects.filter(product=OuterRef('pk'), acknowledged=False)
+                )
+            ).order_by('pk').in_bulk()
+
+            StockMovement.bulk_log([
+                StockMovement(
+                    product=product,
+                    delta=deltas[pk],
+                    resulting_stock=product.stock,
+                    performed_by_id=self.sold_by_id,
+                    reason=f"Sale #{self.pk}",
+                    movement_type='SALE'
+                )
+                for pk, product in products.items()
+                if deltas[pk]
+            ])
+
+        products = list(products.values())
+        _refresh_alerts_on_commit(LowStockAlert.bulk_refresh, products)
+        return products
+
+
+class SaleItemManager(models.Manager):
+    """Joins the product, whose name every serialized sale line includes."""
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('product')
 
 
 class SaleItem(models.Model):
@@ -246,15 +481,51 @@ class SaleItem(models.Model):
     unit_price = models.DecimalField(max_digits=12, decimal_places=2)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2, editable=False)
 
+    objects = SaleItemManager()
+
+    class Meta:
+        indexes = [
+            # Per-product sales analytics join from product to its sales
+            models.Index(fields=['product', 'sale'], name='saleitem_prod_sale_idx'),
+        ]
+
+    def calculate_subtotal(self):
+        # Rounded to cents here so the in-memory value (summed into
+        # Sale.total_amount) matches what the column stores
+        self.subtotal = (self.quantity * self.unit_price).quantize(CENT, rounding=ROUND_HALF_UP)
+        return self.subtotal
+
     def save(self, *args, **kwargs):
-        # Calculate subtotal
-        self.subtotal = Decimal(self.quantity) * self.unit_price
+        self.calculate_subtotal()
         super().save(*args, **kwargs)
 
 # ============================================================================
 # LOW STOCK ALERTS (TRACKED ONLY)
 # ============================================================================
 
+# Upper ratio bounds (stock / reorder_level, inclusive) for each severity;
+# ratios above the last bound fall through to the final name.
+# - critical only for severely depleted stock (10% or less)
+# - warning for moderately low (10-50%)
+# - info for slightly below target (50-100%)
+_SEVERITY_THRESHOLDS = (0.1, 0.5)
+_SEVERITY_NAMES = ('critical', 'warning', 'info')
+
+# Alert messages per severity, filled with (stock, reorder_level)
+_ALERT_TEMPLATES = {
+    'critical': "Stock critically low — %d units remaining (reorder level: %d)",
+    'warning': "Stock warningly low — %d units remaining (reorder level: %d)",
+    'info': "Stock infoly low — %d units remaining (reorder level: %d)",
+}
+
+
+class LowStockAlertManager(models.Manager):
+    """Joins the product, which __str__ and every alert serializer read."""
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('product')
+
+
 class LowStockAlert(models.Model):
     SEVERITY_CHOICES = [
         ('info', 'Info'),
@@ -275,70 +546,159 @@ class LowStockAlert(models.Model):
     acknowledged = models.BooleanField(default=False)
     days_low_stock = models.PositiveIntegerField(default=0)
 
+    objects = LowStockAlertManager()
+
     class Meta:
         ordering = ['-triggered_at']
-        unique_together = ('product', 'acknowledged')
+        constraints = [
+            # One active alert per product; acknowledged history is unbounded
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=Q(acknowledged=False),
+                name='lowstockalert_one_active_per_product'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['-triggered_at'], name='lsa_trig_idx'),
+            # Critical counts per product; unread counts use the partial unique constraint above
+            models.Index(fields=['product'], condition=Q(severity='critical'), name='lsa_critical_prod_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.severity.upper()}] {self.product.name}"
 
+    @staticmethod
+    def severity_for(product):
+        """
+        Return (severity, message) for a product whose stock is below reorder_level.
+
+        Severity levels based on stock:reorder_level ratio:
+        - critical: stock <= 10% of reorder_level (very low, urgent)
+        - warning: 10% < stock <= 50% of reorder_level (getting low)
+        - info: 50% < stock <= 100% of reorder_level (slightly below target)
+        """
+        ratio = product.stock / max(product.reorder_level, 1)
+        # bisect_left keeps the boundaries inclusive (ratio == 0.1 is critical)
+        severity = _SEVERITY_NAMES[bisect_left(_SEVERITY_THRESHOLDS, ratio)]
+
+        message = _ALERT_TEMPLATES[severity] % (product.stock, product.reorder_level)
+        return severity, message
+
     @classmethod
     def create_or_update_for_product(cls, product):
         """
         Create or update low-stock alerts for a product.
         Alerts are only created when stock is strictly below reorder_level.
         When stock is restored above reorder_level, all unacknowledged alerts are deleted.
-        
-        Severity levels based on stock:reorder_level ratio:
-        - critical: stock <= 10% of reorder_level (very low, urgent)
-        - warning: 10% < stock <= 50% of reorder_level (getting low)
-        - info: 50% < stock <= 100% of reorder_level (slightly below target)
+        See severity_for() for the severity levels.
+
+        The consecutive-low counter is incremented in SQL, so concurrent
+        refreshes of the same product cannot lose an increment.
         """
         if not product.is_tracked():
             return
-
         if product.reorder_level is None or product.stock is None:
             return
 
-        # CASE 1: Stock is at or above reorder level — product is healthy
-        # Delete any existing unacknowledged alerts (product no longer needs restocking)
         if product.stock >= product.reorder_level:
-            cls.objects.filter(product=product, acknowledged=False).delete()
+            # has_open_alert (see Sale.finalize) saves the DELETE when nothing is open
+            if getattr(product, 'has_open_alert', True):
+                cls.objects.filter(product=product, acknowledged=False).delete()
             return
 
-        # CASE 2: Stock is below reorder level — determine severity and create/update alert
-        ratio = product.stock / max(product.reorder_level, 1)
+        severity, message = cls.severity_for(product)
+        now = timezone.now()
+        open_alert = cls.objects.filter(product=product, acknowledged=False)
+        changes = {'severity': severity, 'message': message, 'triggered_at': now}
 
-        # Stricter severity thresholds:
-        # - critical only for severely depleted stock (10% or less)
-        # - warning for moderately low (10-50%)
-        # - info for slightly below target (50-100%)
-        if ratio <= 0.1:
-            severity = 'critical'
-        elif ratio <= 0.5:
-            severity = 'warning'
-        else:
-            severity = 'info'
-
-        message = f"Stock {severity}ly low — {product.stock} units remaining (reorder level: {product.reorder_level})"
-
-        alert, created = cls.objects.get_or_create(
-            product=product,
-            acknowledged=False,
-            defaults={
-                'severity': severity,
-                'message': message,
-                'days_low_stock': 0
-            }
-        )
+        # Common case: the alert is already open, so a single UPDATE does it
+        if open_alert.update(days_low_stock=F('days_low_stock') + 1, **changes):
+            return
 
-        # If alert already existed, update severity, message, and track consecutive days low
-        if not created:
-            alert.severity = severity
-            alert.message = message
-            alert.days_low_stock += 1
-            alert.triggered_at = timezone.now()
-            alert.save()
+        try:
+            with transaction.atomic():
+                cls.objects.create(product=product, acknowledged=False, days_low_stock=0, **changes)
+        except IntegrityError:
+            # A concurrent refresh opened it first; count this one against it
+            open_alert.update(days_low_stock=F('days_low_stock') + 1, **changes)
+
+    @classmethod
+    def bulk_refresh(cls, products):
+        """
+        Create, update or clear the unacknowledged alerts of many products at once.
+
+        Healthy products (stock at or above reorder_level) have their unacknowledged
+        alerts removed with one DELETE; low products have their open alerts found
+        with one SELECT, then updated with one UPDATE per batch and the missing
+        ones inserted with one bulk INSERT, instead of get_or_create() + save() each.
+
+        Products annotated with has_open_alert (see Sale.finalize) skip the
+        DELETE or the lookup of existing alerts when there is nothing to find.
+        """
+        healthy, low = [], []
+        for product in products:
+            if not product.is_tracked():
+                continue
+            if product.reorder_level is None or product.stock is None:
+                continue
+            has_open_alert = getattr(product, 'has_open_alert', True)
+            if product.stock >= product.reorder_level:
+                if has_open_alert:
+                    healthy.append(product)
+            else:
+                low.append(product)
+
+        if healthy:
+            cls.objects.filter(product__in=healthy, acknowledged=False).delete()
+
+        if not low:
+            return
+
+        # Open alerts are updated in place (carrying the consecutive-low counter
+        # forward); products without one get a new alert
+        open_alert_products = set()
+        existing = [p for p in low if getattr(p, 'has_open_alert', True)]
+        if existing:
+            open_alert_products = set(
+                cls.objects.filter(product__in=existing, acknowledged=False)
+                .values_list('product_id', flat=True)
+            )
+
+        now = timezone.now()
+        updated, created = [], []
+        for product in low:
+            severity, message = cls.severity_for(product)
+            if product.pk in open_alert_products:
+                updated.append((product.pk, severity, message))
+            else:
+                created.append(cls(
+                    product=product,
+                    acknowledged=False,
+                    severity=severity,
+                    message=message,
+                    days_low_stock=0,
+                    triggered_at=now
+                ))
+
+        # The counter is bumped in SQL, like create_or_update_for_product(), so
+        # a concurrent refresh's increment is never overwritten
+        for i in range(0, len(updated), BULK_BATCH):
+            batch = updated[i:i + BULK_BATCH]
+            cls.objects.filter(product_id__in=[pk for pk, _, _ in batch], acknowledged=False).update(
+                severity=Case(
+                    *[When(product_id=pk, then=Value(severity)) for pk, severity, _ in batch],
+                    output_field=models.CharField()
+                ),
+                message=Case(
+                    *[When(product_id=pk, then=Value(message)) for pk, _, message in batch],
+                    output_field=models.CharField()
+                ),
+                days_low_stock=F('days_low_stock') + 1,
+                triggered_at=now
+            )
+        if created:
+            # A concurrent refresh may have opened the alert first; keep that one
+            cls.objects.bulk_create(created, ignore_conflicts=True, batch_size=BULK_BATCH)
 
 
 # ============================================================================
@@ -357,3 +717,31 @@ class AlertPreference(models.Model):
 
     def __str__(self):
         return f"Alert Preferences for {self.user.username}"
+
+    @staticmethod
+    def _cache_key(user_id):
+        return f'alertpref:{user_id}'
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Return the user's preferences, served from cache when warm.
+
+        Registration creates the row, so a miss is normally a single SELECT;
+        get_or_create still covers users made outside register_user
+        (createsuperuser, admin) or before preferences existed.
+        """
+        key = cls._cache_key(user.pk)
+        pref = cache.get(key)
+        if pref is None:
+            pref, _ = cls.objects.get_or_create(user_id=user.pk)
+            cache.set(key, pref, settings.PHARMACY_ALERT_PREF_CACHE_TTL)
+        return pref
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self._cache_key(self.user_id))
+
+    def delete(self, *args, **kwargs):
+        cache.delete(self._cache_key(self.user_id))
+        return super().delete(*args, **kwargs)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
-from .models import Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference
-from django.db import transaction
+from .models import BULK_BATCH, Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference, uuid7
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from decimal import Decimal
 from django.utils import timezone
 import uuid
@@ -23,6 +24,8 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data['password'],
         )
         Token.objects.create(user=user)
+        # Default alert preferences up front, so the settings endpoint only ever reads
+        AlertPreference.objects.create(user=user)
         return user
 
 
@@ -31,30 +34,93 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
 
+DUPLICATE_SKU_MESSAGE = "SKU already exists. Try a different one."
+DUPLICATE_BARCODE_MESSAGE = "This barcode is already assigned to another product."
+
+
+class ProductListSerializer(serializers.ListSerializer):
+    """Creates a batch of products with one bulk INSERT instead of one per item."""
+
+    def create(self, validated_data):
+        products = [Product(**attrs) for attrs in validated_data]
+        return Product.objects.bulk_create(products, batch_size=BULK_BATCH)
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            errors = self._duplicate_field_errors()
+            if not any(errors):
+                raise
+            raise serializers.ValidationError(errors)
+
+    def _duplicate_field_errors(self):
+        """Per-item errors for products that collided with an existing one or an earlier item (error path only)."""
+        items = self.validated_data
+        taken_skus = set(Product.objects.filter(
+            sku__in=[attrs['sku'] for attrs in items if attrs.get('sku')]
+        ).values_list('sku', flat=True))
+        taken_barcodes = set(Product.objects.filter(
+            barcode__in=[attrs['barcode'] for attrs in items if attrs.get('barcode') is not None]
+        ).values_list('barcode', flat=True))
+
+        errors = []
+        for attrs in items:
+            item_errors = {}
+            sku = attrs.get('sku')
+            if sku:
+                if sku in taken_skus:
+                    item_errors['sku'] = [DUPLICATE_SKU_MESSAGE]
+                taken_skus.add(sku)
+
+            barcode = attrs.get('barcode')
+            if barcode is not None:
+                if barcode in taken_barcodes:
+                    item_errors['barcode'] = [DUPLICATE_BARCODE_MESSAGE]
+                taken_barcodes.add(barcode)
+            errors.append(item_errors)
+        return errors
+
+
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
         read_only_fields = ['user', 'created_at', 'updated_at']
-
-    def validate_sku(self, value):
-        qs = Product.objects.filter(sku=value)
-        if getattr(self, 'instance', None):
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise serializers.ValidationError("SKU already exists. Try a different one.")
-        return value
-
-    def validate_barcode(self, value):
-        if not value:
-            return value
-
-        qs = Product.objects.filter(barcode=value)
-        if getattr(self, 'instance', None):
-            qs = qs.exclude(pk=self.instance.pk)
-        if qs.exists():
-            raise serializers.ValidationError("This barcode is already assigned to another product.")
-        return value
+        list_serializer_class = ProductListSerializer
+        # sku/barcode uniqueness is left to the database's unique indexes
+        # instead of a SELECT per field on every write; see save()
+        extra_kwargs = {
+            'sku': {'validators': []},
+            'barcode': {'validators': []},
+        }
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            errors = self._duplicate_field_errors()
+            if not errors:
+                raise
+            raise serializers.ValidationError(errors)
+
+    def _duplicate_field_errors(self):
+        """Work out which unique field a rejected write collided on (error path only)."""
+        others = Product.objects.all()
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+
+        errors = {}
+        sku = self.validated_data.get('sku')
+        if sku and others.filter(sku=sku).exists():
+            errors['sku'] = [DUPLICATE_SKU_MESSAGE]
+
+        barcode = self.validated_data.get('barcode')
+        if barcode is not None and others.filter(barcode=barcode).exists():
+            errors['barcode'] = [DUPLICATE_BARCODE_MESSAGE]
+        return errors
 
     def validate(self, data):
         """
@@ -75,6 +141,11 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
+    # Just what the ownership check, adjust_stock(), the alert refresh and the
+    # response read; descriptions and pricing columns are never loaded
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.only(
+        'user', 'sku', 'name', 'is_volatile', 'stock', 'reorder_level'
+    ))
     product_name = serializers.ReadOnlyField(source='product.name')
     sku = serializers.ReadOnlyField(source='product.sku')
     performed_by_name = serializers.ReadOnlyField(source='performed_by.username')
@@ -96,15 +167,65 @@ class StockMovementSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['performed_by', 'resulting_stock', 'timestamp', 'movement_type']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the product and user rendered as sku/product_name/performed_by_name, loading only those columns."""
+        return queryset.select_related('product', 'performed_by').only(
+            'product', 'delta', 'resulting_stock', 'performed_by', 'reason', 'movement_type', 'timestamp',
+            'product__sku', 'product__name', 'performed_by__username'
+        )
+
+
+def _is_malformed_pk(data):
+    """True for values int() would coerce but no client means as a pk: true, 1.9."""
+    return isinstance(data, bool) or (isinstance(data, float) and not data.is_integer())
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves pks from a pk -> instance map when one
+    has been prefetched, falling back to the normal per-value lookup otherwise.
+    """
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if _is_malformed_pk(data):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if self.prefetched is not None:
+            try:
+                return self.prefetched[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_internal_value(data)
+
+
+class SaleItemListSerializer(serializers.ListSerializer):
+    """Resolves every line's product with one query instead of one per line."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            pks = set()
+            for item in data:
+                if isinstance(item, dict) and item.get('product') is not None and not _is_malformed_pk(item['product']):
+                    try:
+                        pks.add(int(item['product']))
+                    except (TypeError, ValueError):
+                        pass
+            product_field = self.child.fields['product']
+            product_field.prefetched = product_field.get_queryset().in_bulk(pks)
+        return super().to_internal_value(data)
+
+
 class SaleItemSerializer(serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
     subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
-    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), required=False, allow_null=True)
+    product = PrefetchedPrimaryKeyRelatedField(queryset=Product.objects.all(), required=False, allow_null=True)
     product_data = ProductSerializer(write_only=True, required=False)
 
     class Meta:
         model = SaleItem
         fields = ['product', 'product_data', 'product_name', 'quantity', 'unit_price', 'subtotal']
+        list_serializer_class = SaleItemListSerializer
 
 class SaleSerializer(serializers.ModelSerializer):
     items = SaleItemSerializer(many=True)
@@ -122,6 +243,15 @@ class SaleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['sold_by', 'total_amount', 'timestamp', 'synced_at', 'id']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Fetch the nested items (and, through SaleItem's manager, their products) in one query."""
+        # Only the columns SaleItemSerializer renders; product descriptions stay on disk
+        items = SaleItem.objects.only(
+            'sale', 'product', 'quantity', 'unit_price', 'subtotal', 'product__name'
+        )
+        return queryset.prefetch_related(Prefetch('items', queryset=items))
+
     def create(self, validated_data):
         """
         OFFLINE-FIRST SALES SYNC (APPEND-ONLY, IDEMPOTENT)
@@ -139,104 +269,112 @@ class SaleSerializer(serializers.ModelSerializer):
         
         # Extract offline-sync metadata
         external_id = validated_data.pop('external_id', None)
-        import traceback
-        
         source_device = validated_data.pop('source_device', 'web')
         client_timestamp = validated_data.pop('client_timestamp', None)
 
-        # IDEMPOTENCY: If external_id provided and already exists, return existing sale silently
-        # This allows safe retries from offline clients without duplicating sales
-        if external_id:
-            try:
-                existing_sale = Sale.objects.get(external_id=external_id)
-                # Sale already synced; return it without error
-                return existing_sale
-            except Sale.DoesNotExist:
-                pass
-        else:
+        if not external_id:
             # Generate external_id if not provided (ensures all sales can be de-duplicated)
-            external_id = uuid.uuid4()
+            external_id = uuid7()
 
         # TRANSACTION: All-or-nothing multi-item sale creation + stock adjustment
         # Ensures atomicity: if any item fails, entire sale is rolled back
         with transaction.atomic():
             # Create Sale with offline-sync metadata
-            sale = Sale.objects.create(
+            # IDEMPOTENCY: If external_id already exists, return existing sale silently
+            # This allows safe retries from offline clients without duplicating sales
+            sale, created = Sale.ingest(
+                external_id,
                 sold_by=user,
-                external_id=external_id,
                 source_device=source_device,
                 client_timestamp=client_timestamp or timezone.now(),
                 client_uuid=uuid.uuid4(),
+                business_date=business_date or timezone.now().date(),
                 **validated_data
             )
+            if not created:
+                # Sale already synced; return it without error
+                return sale
 
             total_amount = Decimal('0.00')
-            products_to_alert = []  # Track non-volatile products for alert triggering
+            sale_items = []  # Inserted in one pass; stock for non-volatile items is deducted below
+            volatile_products = {}  # pk -> product carrying its last-used price
+
+            # Support either existing product (PK) or nested product_data for one-off items.
+            # One-off products are validated together and created, owned by this user,
+            # with a single INSERT before the lines are built.
+            one_off_items = [
+                item_data for item_data in items_data
+                if item_data.get('product') is None and item_data.get('product_data')
+            ]
+            if one_off_items:
+                prod_serializer = ProductSerializer(
+                    data=[item_data['product_data'] for item_data in one_off_items], many=True
+                )
+                prod_serializer.is_valid(raise_exception=True)
+                for item_data, product in zip(one_off_items, prod_serializer.save(user=user)):
+                    item_data['product'] = product
 
             for item_data in items_data:
-                # Support either existing product (PK) or nested product_data for one-off items
                 product = item_data.get('product')
-                product_data = item_data.get('product_data')
-
-                if product is None and product_data:
-                    # One-off product: create it owned by this user
-                    prod_serializer = ProductSerializer(data=product_data)
-                    prod_serializer.is_valid(raise_exception=True)
-                    product = prod_serializer.save(user=user)
 
-                quantity = Decimal(item_data['quantity'])
+                quantity = item_data['quantity']  # already a Decimal from the DecimalField
                 unit_price = item_data.get('unit_price')
                 if unit_price is None:
                     unit_price = product.unit_price if product is not None else Decimal('0.00')
 
-                # Create SaleItem (always persisted, regardless of stock status)
-                sale_item = SaleItem.objects.create(
+                # Build SaleItem (always persisted, regardless of stock status);
+                # all lines are inserted together after the loop
+                sale_item = SaleItem(
                     sale=sale,
                     product=product,
                     quantity=quantity,
                     unit_price=unit_price,
-                    business_date=business_date or timezone.now().date(),
                 )
+                sale_items.append(sale_item)
 
-                # Accumulate total server-side (never trust client total)
-                total_amount += sale_item.subtotal
+                # Accumulate total server-side (never trust client total);
+                # bulk_create() skips save(), so the subtotal is computed here once
+                total_amount += sale_item.calculate_subtotal()
 
                 # VOLATILE PRODUCTS: Bypass stock entirely, still record in analytics
                 # Update product's last-used price for dynamic pricing suggestions
                 if getattr(product, 'is_volatile', False):
                     product.unit_price = unit_price
-                    product.save(update_fields=['unit_price', 'updated_at'])
-                
-                # NON-VOLATILE PRODUCTS: Deduct stock on backend, allow negative, trigger alerts
-                else:
-                    # Always deduct stock (no validation, allow negative)
-                    # Backend stock is derived, never sent from client
-                    qty_int = int(quantity)
-                    product.adjust_stock(
-                        qty_delta=-qty_int,
-                        by_user=user,
-                        reason=f"Sale #{sale.id}",
-                        movement_type='SALE'
-                    )
-                    # Mark for alert creation after all items are saved
-                    if product not in products_to_alert:
-                        products_to_alert.append(product)
+                    volatile_products[product.pk] = product
+
+            SaleItem.objects.bulk_create(sale_items, batch_size=BULK_BATCH)
+
+            if volatile_products:
+                # One UPDATE for all last-used prices, stamped once instead of per-row auto_now
+                now = timezone.now()
+                for product in volatile_products.values():
+                    product.updated_at = now
+                Product.objects.bulk_update(
+                    volatile_products.values(), ['unit_price', 'updated_at'], batch_size=BULK_BATCH
+                )
+
+            # NON-VOLATILE PRODUCTS: Deduct stock on backend, allow negative, trigger alerts
+            # Always deduct stock (no validation, allow negative)
+            # Backend stock is derived, never sent from client
+            # (Idempotent alerts: existing alert is updated, new one created if needed)
+            sale.finalize(sale_items)
 
             # Server-side total computation (NEVER trust client)
             sale.total_amount = total_amount
             sale.synced_at = timezone.now()  # Mark as fully synced
             sale.save(update_fields=['total_amount', 'synced_at', 'updated_at'])
 
-            # Trigger low-stock alerts for non-volatile products
-            # (Idempotent: existing alert is updated, new one created if needed)
-            for product in products_to_alert:
-                LowStockAlert.create_or_update_for_product(product)
-
         return sale
 
 
+class ProductBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'sku', 'stock', 'reorder_level']
+
+
 class LowStockAlertSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductBriefSerializer(read_only=True)
 
     class Meta:
         model = LowStockAlert
@@ -249,22 +387,23 @@ class LowStockAlertSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['triggered_at', 'acknowledged']
 
-class ProductBriefSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Product
-        fields = ['id', 'name', 'sku', 'stock', 'reorder_level']
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Join the product and load only the columns this serializer renders."""
+        return queryset.select_related('product').only(
+            'product', 'severity', 'message', 'days_low_stock',
+            # AlertHistoryPagination orders and builds its cursors on triggered_at
+            'triggered_at',
+            *('product__' + f for f in ProductBriefSerializer.Meta.fields)
+        )
 
-class AlertSerializer(serializers.ModelSerializer):
-    product = ProductBriefSerializer(read_only=True)
-
-    class Meta:
-        model = LowStockAlert
-        fields = [
-            'id', 'product', 'severity', 'triggered_at',
-            'acknowledged', 'days_low_stock', 'message'
-        ]
 
 class AlertPreferenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = AlertPreference
         fields = ['notify_email', 'notify_inapp']
+
+
+class AcknowledgeAlertsSerializer(serializers.Serializer):
+    """Alert ids to acknowledge; bounded so one request cannot issue unbounded UPDATEs."""
+    alert_ids = serializers.ListField(child=serializers.IntegerField(), max_length=10000, default=list)
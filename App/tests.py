@@ -1,3 +1,661 @@
-from django.test import TestCase
+import csv
+import re
+import threading
+import time as clock
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import AlertPreference, LowStockAlert, Product, Sale, SaleItem, StockMovement, _lock_products
+
+
+class APITestCase(TestCase):
+    """Signs in one user per test through the API client."""
+
+    def setUp(self):
+        # List pages and alert preferences are cached per process
+        cache.clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_sale(self, timestamp, amount):
+        return Sale.objects.create(
+            sold_by=self.user, client_uuid=uuid.uuid4(), timestamp=timestamp, total_amount=amount
+        )
+
+
+@override_settings(TIME_ZONE="America/New_York")
+class SalesTrendTests(APITestCase):
+    tz = ZoneInfo("America/New_York")
+
+    def setUp(self):
+        super().setUp()
+        # Local midnight between Sunday 31 May and Monday 1 June starts a new
+        # day, ISO week and month at once; in UTC both sales share a day
+        for stamp, amount in [
+            (datetime(2026, 5, 31, 12, 0), "5.00"),
+            (datetime(2026, 5, 31, 23, 59, 59), "2.50"),
+            (datetime(2026, 6, 1, 0, 0), "4.00"),
+        ]:
+            self.make_sale(stamp.replace(tzinfo=self.tz), amount)
+
+    def trend(self, period):
+        response = self.client.get("/api/sales/trend/", {"period": period})
+        self.assertEqual(response.status_code, 200)
+        return [(row["date"], row["count"], row["total_amount"]) for row in response.data]
+
+    def test_daily_buckets_split_at_local_midnight(self):
+        self.assertEqual(self.trend("daily"), [
+            (date(2026, 5, 31), 2, 7.5),
+            (date(2026, 6, 1), 1, 4.0),
+        ])
+
+    def test_weekly_buckets_start_on_monday(self):
+        self.assertEqual(self.trend("weekly"), [
+            (datetime(2026, 5, 25, tzinfo=self.tz), 2, 7.5),
+            (datetime(2026, 6, 1, tzinfo=self.tz), 1, 4.0),
+        ])
+
+    def test_monthly_buckets_start_on_the_first(self):
+        self.assertEqual(self.trend("monthly"), [
+            (datetime(2026, 5, 1, tzinfo=self.tz), 2, 7.5),
+            (datetime(2026, 6, 1, tzinfo=self.tz), 1, 4.0),
+        ])
+
+    def test_deleted_sales_leave_the_trend(self):
+        Sale.objects.filter(timestamp__gte=datetime(2026, 6, 1, tzinfo=self.tz)).delete()
+        self.assertEqual(self.trend("daily"), [(date(2026, 5, 31), 2, 7.5)])
+
+
+class DashboardTests(APITestCase):
+    def test_sales_today_starts_at_local_midnight(self):
+        midnight = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        self.make_sale(midnight - timedelta(seconds=1), "9.00")
+        self.make_sale(midnight, "3.00")
+
+        response = self.client.get("/api/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sales_today"], {"count": 1, "revenue": 3.0})
+
+
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        response = APIClient().post("/api/login/", {"username": "alice", "password": "pw"}, format="json")
+        self.token = response.data["token"]
+
+    def get_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+        return client.get("/api/user/").status_code
+
+    def test_logout_revokes_the_token_for_every_client(self):
+        self.assertEqual(self.get_user(), 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + self.token)
+        self.assertEqual(client.post("/api/logout/").status_code, 200)
+        self.assertEqual(self.get_user(), 401)
+
+    def test_deactivated_user_is_rejected_immediately(self):
+        self.assertEqual(self.get_user(), 200)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_user(), 401)
+
+
+class ListPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(user=self.user, sku="S1", name="P1", unit_price="1.00", stock=100)
+
+    def follow(self, url):
+        """Return every row of a list by following its Link rel="next" header."""
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIsInstance(response.json(), list)
+            rows.extend(response.json())
+            match = re.search(r'<([^>]+)>; rel="next"', response.get("Link", ""))
+            url = match and match.group(1)
+        return rows
+
+    def test_sales_sharing_a_timestamp_page_without_gaps_or_repeats(self):
+        stamp = timezone.now()
+        sales = [self.make_sale(stamp, "1.00") for _ in range(5)]
+        rows = self.follow("/api/sales/?limit=2")
+        self.assertEqual([row["id"] for row in rows], [sale.pk for sale in reversed(sales)])
+
+    def test_product_list_is_a_bare_array_with_total_header(self):
+        Product.objects.create(user=self.user, sku="S2", name="P2", unit_price="1.00")
+        response = self.client.get("/api/products/?limit=1")
+        self.assertEqual([row["sku"] for row in response.json()], ["S1"])
+        self.assertEqual(response["X-Total-Count"], "2")
+        self.assertEqual([row["sku"] for row in self.follow("/api/products/?limit=1")], ["S1", "S2"])
+
+    def test_stock_movements_page_and_ignore_a_bad_limit(self):
+        for delta in (1, 2, 3):
+            self.product.adjust_stock(qty_delta=delta, by_user=self.user)
+        self.assertEqual([row["delta"] for row in self.follow("/api/stock-movements/?limit=2")], [3, 2, 1])
+        response = self.client.get("/api/stock-movements/?limit=abc")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_alert_history_pages_without_deferred_field_loads(self):
+        for i in range(4):
+            product = Product.objects.create(user=self.user, sku=f"L{i}", name="low", unit_price="1.00", reorder_level=5)
+            LowStockAlert.objects.create(product=product, severity="critical", message="low", acknowledged=True)
+        # The page and the counts only; no per-row triggered_at fetch for the cursors
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/alerts/history/?limit=2")
+        self.assertEqual(len(response.data["alerts"]), 2)
+        self.assertEqual(response.data["critical_count"], 4)
+        self.assertIsNotNone(response.data["next"])
+
+
+class SaleProductLookupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(user=self.user, sku="S1", name="P1", unit_price="2.00", stock=10)
+
+    def sell(self, product):
+        return self.client.post("/api/sales/", {
+            "items": [{"product": product, "quantity": "1", "unit_price": "2.00"}]
+        }, format="json")
+
+    def test_integer_and_numeric_string_pks_are_accepted(self):
+        self.assertEqual(self.sell(self.product.pk).status_code, 201)
+        self.assertEqual(self.sell(str(self.product.pk)).status_code, 201)
+        self.assertEqual(self.sell(float(self.product.pk)).status_code, 201)
+
+    def test_booleans_and_fractional_pks_are_rejected(self):
+        for product in (True, self.product.pk + 0.9):
+            response = self.sell(product)
+            self.assertEqual(response.status_code, 400, product)
+            self.assertIn("Incorrect type", str(response.data))
+        self.assertFalse(Sale.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 10)
+
+
+class AcknowledgeAlertTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.alerts = [
+            LowStockAlert.objects.create(
+                product=Product.objects.create(user=self.user, sku=f"S{i}", name="P", unit_price="1.00"),
+                severity="warning", message="low"
+            )
+            for i in range(3)
+        ]
+
+    def acknowledge(self, alert_ids):
+        return self.client.post("/api/alerts/acknowledge/", {"alert_ids": alert_ids}, format="json")
+
+    def test_acknowledges_only_the_listed_open_alerts(self):
+        response = self.acknowledge([self.alerts[0].pk, str(self.alerts[1].pk), self.alerts[0].pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"message": "2 alerts acknowledged."})
+        self.assertEqual(LowStockAlert.objects.filter(acknowledged=False).get(), self.alerts[2])
+
+    def test_malformed_ids_are_rejected(self):
+        pk = self.alerts[0].pk
+        for alert_ids in (str(pk), [pk + 0.5], [True], ["x"], [pk] * 10001):
+            self.assertEqual(self.acknowledge(alert_ids).status_code, 400, str(alert_ids)[:20])
+        self.assertFalse(LowStockAlert.objects.filter(acknowledged=True).exists())
+
+
+class CSVImportTests(APITestCase):
+    def upload(self, content):
+        return self.client.post(
+            "/api/products/import_csv/",
+            {"file": SimpleUploadedFile("products.csv", content, content_type="text/csv")},
+            format="multipart"
+        )
+
+    def assert_result_matches_database(self, result):
+        self.assertEqual(Product.objects.filter(user=self.user).count(), result["created"])
+        self.assertEqual(StockMovement.objects.filter(movement_type="IMPORT").count(), result["created"])
+
+    def test_row_errors_and_opening_stock(self):
+        Product.objects.create(user=self.user, sku="OLD", name="Old", unit_price="1.00")
+        response = self.upload(
+            b"Product Name,SKU,Qty,Price\n"
+            b"A,A1,5,$2.50\nB,,3,1.00\nC,A1,1,1.00\nD,OLD,1,1.00\nE,E1,x,1.00\nF,F1,0,1.00\n"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "partial")
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([error.split(":")[0] for error in response.data["errors"]], ["Row 2", "Row 3", "Row 4", "Row 5"])
+        self.assertEqual(Product.objects.get(sku="A1").unit_price, Decimal("2.50"))
+        # Zero opening stock records no movement
+        self.assertEqual(list(StockMovement.objects.values_list("product__sku", "delta", "resulting_stock")), [("A1", 5, 5)])
+
+    def test_batch_size_does_not_change_the_result(self):
+        Product.objects.create(user=self.user, sku="OLD", name="Old", unit_price="1.00")
+        content = b"name,sku,qty,price\n" + b"".join(
+            b"P,%s,%d,1.00\n" % (sku, i) for i, sku in enumerate([b"A", b"B", b"OLD", b"A", b"", b"C", b"D"])
+        )
+
+        def run():
+            result = self.upload(content).data
+            rows = sorted(Product.objects.exclude(sku="OLD").values_list("sku", "stock"))
+            movements = sorted(StockMovement.objects.values_list("product__sku", "delta"))
+            Product.objects.exclude(sku="OLD").delete()
+            return result, rows, movements
+
+        unbatched = run()
+        with patch("App.utils.csv_importer.BULK_BATCH", 2):
+            self.assertEqual(run(), unbatched)
+        self.assertEqual(unbatched[0]["created"], 4)
+
+    @patch("App.utils.csv_importer.BULK_BATCH", 2)
+    def test_undecodable_bytes_keep_committed_batches_and_report_the_row(self):
+        rows = b"".join(b"Product %04d,SKU%04d,1,1.00\n" % (i, i) for i in range(1, 601))
+        response = self.upload(b"name,sku,qty,price\n" + rows + b"Bad \xff,BAD,1,1.00\n")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "partial")
+        [error] = response.data["errors"]
+        self.assertIn("Could not read the file", error)
+        # Every row before the reported one was imported, nothing from it on
+        self.assertEqual(error.split(":")[0], "Row %d" % (response.data["created"] + 1))
+        self.assertGreater(response.data["created"], 2)
+        self.assertFalse(Product.objects.filter(sku="BAD").exists())
+        self.assert_result_matches_database(response.data)
+
+    @patch("App.utils.csv_importer.BULK_BATCH", 2)
+    def test_malformed_row_keeps_committed_batches_and_reports_the_row(self):
+        oversized = b"x" * (csv.field_size_limit() + 1)
+        response = self.upload(
+            b"name,sku,qty,price\nA,A1,1,1.00\nB,B1,1,1.00\nC,C1,1,1.00\n" + oversized + b",D1,1,1.00\nE,E1,1,1.00\n"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 3)
+        [error] = response.data["errors"]
+        self.assertTrue(error.startswith("Row 4: Could not read the file"), error)
+        self.assertEqual(sorted(Product.objects.values_list("sku", flat=True)), ["A1", "B1", "C1"])
+        self.assert_result_matches_database(response.data)
+
+    def test_undecodable_header_is_an_error(self):
+        response = self.upload(b"name,sku\xff,qty,price\nA,A1,1,1.00\n")
+        self.assertEqual(response.data["status"], "error")
+        self.assertFalse(Product.objects.exists())
+
+
+class ErrorResponseTests(APITestCase):
+    """Every API error carries the same error / message / status_code body."""
+
+    def test_not_found(self):
+        response = self.client.get("/api/products/999999/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {"error": True, "message": "No Product matches the given query.", "status_code": 404})
+
+    def test_validation_errors_are_the_message(self):
+        response = self.client.post("/api/alerts/acknowledge/", {"alert_ids": "x"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"error", "message", "status_code"})
+        self.assertEqual((response.data["error"], response.data["status_code"]), (True, 400))
+        self.assertIn("alert_ids", response.data["message"])
+
+    def test_unauthenticated(self):
+        response = APIClient().get("/api/products/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["status_code"], 401)
+
+    def test_unhandled_error_is_logged_and_answered(self):
+        with patch.object(AlertPreference, "for_user", side_effect=ValueError("boom")), \
+                self.assertLogs("App.utils.exeptions", "ERROR"):
+            response = self.client.get("/api/alerts/settings/")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data, {"error": True, "message": "boom", "status_code": 500})
+
+
+class ProductLockTests(TestCase):
+    def test_locks_bigint_pks_on_postgresql(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("advisory locks are PostgreSQL only")
+        pks = [1, 2**31, 2**62]
+        with transaction.atomic():
+            self.assertTrue(_lock_products(pks))
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+                self.assertEqual(cursor.fetchone()[0], len(pks))
+
+    def test_falls_back_to_row_locks_elsewhere(self):
+        if connection.vendor == "postgresql":
+            self.skipTest("covered by the advisory lock test")
+        self.assertFalse(_lock_products([1]))
+
+
+class AlertRefreshFailureTests(TransactionTestCase):
+    """on_commit callbacks only run for real outside TestCase's wrapping transaction."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(user=self.user, sku="S1", name="P1", unit_price="2.00", stock=10, reorder_level=8)
+
+    def test_sale_succeeds_when_the_alert_refresh_fails(self):
+        with patch.object(LowStockAlert, "bulk_refresh", side_effect=RuntimeError("boom")), \
+                self.assertLogs("App.models", "ERROR") as logs:
+            response = self.client.post("/api/sales/", {
+                "items": [{"product": self.product.pk, "quantity": "3", "unit_price": "2.00"}]
+            }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("alert refresh failed", logs.output[0])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+    def test_stock_movement_succeeds_when_the_alert_refresh_fails(self):
+        with patch.object(LowStockAlert, "create_or_update_for_product", side_effect=RuntimeError("boom")), \
+                self.assertLogs("App.models", "ERROR"):
+            response = self.client.post("/api/stock-movements/", {"product": self.product.pk, "delta": -5}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
+
+
+class ConcurrentStockWriterTests(TransactionTestCase):
+    """A writer that skips the advisory lock commits while a sale waits on its row."""
+
+    def setUp(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("needs concurrent row locks")
+        self.user = User.objects.create_user("alice", password="pw")
+        self.product = Product.objects.create(user=self.user, sku="S1", name="P1", unit_price="2.00", stock=10)
+
+    def test_sale_keeps_a_concurrent_plain_update(self):
+        sale = Sale.objects.create(sold_by=self.user, client_uuid=uuid.uuid4(), total_amount="6.00")
+        errors = []
+
+        def finalize():
+            try:
+                sale.finalize([SaleItem(product=self.product, quantity=3, unit_price="2.00")])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            # Like a product PUT: no advisory lock, holds the row until commit
+            Product.objects.filter(pk=self.product.pk).update(stock=100)
+            seller = threading.Thread(target=finalize)
+            seller.start()
+            with connection.cursor() as cursor:
+                for _ in range(500):
+                    cursor.execute("SELECT count(*) FROM pg_locks WHERE NOT granted")
+                    if cursor.fetchone()[0]:
+                        break
+                    clock.sleep(0.01)
+                else:
+                    self.fail("the sale never waited on the product row")
+        seller.join()
+
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 97)
+        self.assertEqual(list(StockMovement.objects.values_list("delta", "resulting_stock")), [(-3, 97)])
+
+
+def _alert_rows(products):
+    """Every alert of `products` as comparable tuples, keyed by product position."""
+    position = {product.pk: i for i, product in enumerate(products)}
+    return sorted(
+        (position[product_id], severity, message, days_low_stock, acknowledged)
+        for product_id, severity, message, days_low_stock, acknowledged in LowStockAlert.objects.filter(
+            product__in=products
+        ).values_list("product_id", "severity", "message", "days_low_stock", "acknowledged")
+    )
+
+
+class SaleFinalizeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.low = Product.objects.create(user=self.user, sku="A", name="A", unit_price="2.00", stock=10, reorder_level=8)
+        self.fine = Product.objects.create(user=self.user, sku="B", name="B", unit_price="1.00", stock=20, reorder_level=5)
+        self.volatile = Product.objects.create(user=self.user, sku="V", name="V", unit_price="1.00", is_volatile=True, stock=0)
+
+    def sell(self, items, external_id=None):
+        payload = {"items": items}
+        if external_id:
+            payload["external_id"] = str(external_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/sales/", payload, format="json")
+
+    def lines(self):
+        return [
+            {"product": self.low.pk, "quantity": "3", "unit_price": "2.00"},
+            {"product": self.fine.pk, "quantity": "2", "unit_price": "1.00"},
+            {"product": self.low.pk, "quantity": "2", "unit_price": "2.00"},
+            {"product": self.volatile.pk, "quantity": "1.5", "unit_price": "4.00"},
+        ]
+
+    def test_stock_and_alerts_match_per_line_adjustments(self):
+        response = self.sell(self.lines())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_amount"], "18.00")
+
+        # The per-line path finalize() replaced: one adjust_stock() per tracked line
+        twins = [
+            Product.objects.create(user=self.user, sku=f"{p.sku}2", name=p.name, unit_price=p.unit_price,
+                                   stock=stock, reorder_level=p.reorder_level)
+            for p, stock in ((self.low, 10), (self.fine, 20))
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            for twin, quantity in ((twins[0], 3), (twins[1], 2), (twins[0], 2)):
+                twin.adjust_stock(qty_delta=-quantity, by_user=self.user)
+
+        products = [Product.objects.get(pk=self.low.pk), Product.objects.get(pk=self.fine.pk)]
+        self.assertEqual([p.stock for p in products], [5, 18])
+        self.assertEqual([p.stock for p in products], [Product.objects.get(pk=t.pk).stock for t in twins])
+        # Same alert rows, except the consecutive-low counter now counts sales, not lines
+        self.assertEqual(_alert_rows(products), [(0, "info", "Stock infoly low — 5 units remaining (reorder level: 8)", 0, False)])
+        self.assertEqual(
+            [row[:3] + row[4:] for row in _alert_rows(products)],
+            [row[:3] + row[4:] for row in _alert_rows(twins)]
+        )
+
+    def test_one_net_movement_per_tracked_product(self):
+        self.sell(self.lines())
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("product__sku", "delta", "resulting_stock", "movement_type")),
+            [("A", -5, 5, "SALE"), ("B", -2, 18, "SALE")]
+        )
+        self.volatile.refresh_from_db()
+        self.assertEqual((self.volatile.stock, self.volatile.unit_price), (0, Decimal("4.00")))
+
+    def test_generated_external_id_is_time_ordered(self):
+        before = int(clock.time() * 1000)
+        self.sell(self.lines())
+        self.sell(self.lines())
+        first, second = Sale.objects.order_by("id").values_list("external_id", flat=True)
+        self.assertEqual((first.version, second.version), (7, 7))
+        self.assertGreaterEqual(first.int >> 80, before)
+        self.assertLess(first, second)
+
+    def test_replayed_external_id_returns_the_same_sale(self):
+        external_id = uuid.uuid4()
+        first = self.sell(self.lines(), external_id)
+        replay = self.sell(self.lines(), external_id)
+
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.data["id"], first.data["id"])
+        self.assertEqual(replay.data["total_amount"], first.data["total_amount"])
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(StockMovement.objects.count(), 2)
+        self.low.refresh_from_db()
+        self.assertEqual(self.low.stock, 5)
+
+    def test_ingest_returns_the_existing_sale_for_a_known_external_id(self):
+        external_id = uuid.uuid4()
+        sale, created = Sale.ingest(external_id, sold_by=self.user, client_uuid=uuid.uuid4())
+        again, created_again = Sale.ingest(external_id, sold_by=self.user, client_uuid=uuid.uuid4())
+        self.assertEqual((created, created_again), (True, False))
+        self.assertEqual(again.pk, sale.pk)
+
+    def test_batch_sync_skips_replayed_sales(self):
+        external_id = str(uuid.uuid4())
+        self.sell(self.lines(), external_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/sales/batch/", {"business_date": "2026-01-15", "sales": [
+                {"external_id": external_id, "items": self.lines()},
+                {"items": [{"product": self.fine.pk, "quantity": "1", "unit_price": "1.00"}]},
+            ]}, format="json")
+        self.assertEqual((response.data["created"], response.data["duplicate"], response.data["failed"]), (1, 1, 0))
+        self.fine.refresh_from_db()
+        self.assertEqual(self.fine.stock, 17)
+
+
+class LowStockAlertTests(APITestCase):
+    # (stock, reorder_level, volatile, existing alerts as (severity, days, acknowledged))
+    STATES = [
+        (9, 8, False, [("info", 3, False)]),     # recovered: open alert removed
+        (5, 8, False, []),                       # newly low: alert opened
+        (0, 8, False, [("warning", 2, False)]),  # still low: escalated in place
+        (3, 8, False, [("info", 4, True)]),      # history only: new alert next to it
+        (1, 8, True, []),                        # volatile: never alerted
+        (8, 8, False, []),                       # at reorder level: not low
+    ]
+
+    def make_products(self, prefix):
+        products = []
+        for i, (stock, reorder_level, volatile, alerts) in enumerate(self.STATES):
+            product = Product.objects.create(
+                user=self.user, sku=f"{prefix}{i}", name="P", unit_price="1.00",
+                stock=stock, reorder_level=reorder_level, is_volatile=volatile
+            )
+            for severity, days, acknowledged in alerts:
+                LowStockAlert.objects.create(
+                    product=product, severity=severity, message="old",
+                    days_low_stock=days, acknowledged=acknowledged
+                )
+            products.append(product)
+        return products
+
+    def test_bulk_refresh_matches_per_product_refresh(self):
+        one_by_one, bulk = self.make_products("X"), self.make_products("Y")
+        for product in one_by_one:
+            LowStockAlert.create_or_update_for_product(product)
+        LowStockAlert.bulk_refresh(bulk)
+
+        self.assertEqual(_alert_rows(bulk), _alert_rows(one_by_one))
+        self.assertEqual(_alert_rows(bulk), [
+            (1, "info", "Stock infoly low — 5 units remaining (reorder level: 8)", 0, False),
+            (2, "critical", "Stock critically low — 0 units remaining (reorder level: 8)", 3, False),
+            (3, "info", "old", 4, True),
+            (3, "warning", "Stock warningly low — 3 units remaining (reorder level: 8)", 0, False),
+        ])
+
+    def test_bulk_refresh_keeps_a_concurrent_increment(self):
+        product = Product.objects.create(user=self.user, sku="C", name="P", unit_price="1.00", stock=2, reorder_level=8)
+        alert = LowStockAlert.objects.create(product=product, severity="info", message="old", days_low_stock=1)
+        severity_for = LowStockAlert.severity_for
+
+        def bump_then_grade(product):
+            # Another refresh commits after this one already found the alert
+            LowStockAlert.objects.filter(pk=alert.pk).update(days_low_stock=F("days_low_stock") + 1)
+            return severity_for(product)
+
+        with patch.object(LowStockAlert, "severity_for", side_effect=bump_then_grade):
+            LowStockAlert.bulk_refresh([product])
+
+        alert.refresh_from_db()
+        self.assertEqual((alert.severity, alert.days_low_stock), ("warning", 3))
+
+    def test_only_one_active_alert_per_product(self):
+        product = Product.objects.create(user=self.user, sku="S", name="P", unit_price="1.00", stock=1, reorder_level=8)
+        LowStockAlert.create_or_update_for_product(product)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LowStockAlert.objects.create(product=product, severity="info", message="dup")
+
+        LowStockAlert.objects.filter(product=product).update(acknowledged=True)
+        LowStockAlert.create_or_update_for_product(product)
+        self.assertEqual(
+            sorted(LowStockAlert.objects.filter(product=product).values_list("acknowledged", "days_low_stock")),
+            [(False, 0), (True, 0)]
+        )
+
+
+class ProductListCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(user=self.user, sku="S1", name="P1", unit_price="1.00")
+
+    def test_revalidation_and_cached_bodies(self):
+        first = self.client.get("/api/products/")
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):  # only the version aggregate
+            hit = self.client.get("/api/products/")
+        self.assertEqual((hit.content, hit["ETag"]), (first.content, first["ETag"]))
+
+        not_modified = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+
+    def test_writes_and_deletes_change_the_etag(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        self.client.patch(f"/api/products/{self.product.pk}/", {"name": "renamed"}, format="json")
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["name"] for row in response.json()], ["renamed"])
+
+        etag = response["ETag"]
+        self.client.delete(f"/api/products/{self.product.pk}/")
+        response = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+    def test_entries_are_per_user_and_per_format(self):
+        etag = self.client.get("/api/products/")["ETag"]
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("bob", password="pw"))
+        response = other.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.json()), (200, []))
+
+        html = self.client.get("/api/products/", HTTP_ACCEPT="text/html")
+        self.assertEqual(html["Content-Type"], "text/html; charset=utf-8")
+        self.assertNotEqual(html["ETag"], etag)
+
+
+class AlertPreferenceTests(APITestCase):
+    def test_register_creates_token_and_default_preferences(self):
+        response = APIClient().post("/api/register/", {"username": "bob", "password": "pw12345!x"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        bob = User.objects.get(username="bob")
+        self.assertEqual(response.data["token"], bob.auth_token.key)
+        self.assertEqual(
+            AlertPreference.objects.filter(user=bob).values_list("notify_email", "notify_inapp").get(),
+            (True, True)
+        )
+
+    def test_saved_settings_are_served_fresh_from_the_cache(self):
+        self.assertEqual(self.client.get("/api/alerts/settings/").data, {"notify_email": True, "notify_inapp": True})
+        with self.assertNumQueries(0):
+            self.client.get("/api/alerts/settings/")
+
+        self.client.put("/api/alerts/settings/", {"notify_email": False}, format="json")
+        self.assertEqual(self.client.get("/api/alerts/settings/").data, {"notify_email": False, "notify_inapp": True})
+
+    def test_partial_put_keeps_changes_behind_a_stale_cached_copy(self):
+        self.client.get("/api/alerts/settings/")
+        # Another worker's change: its own process cache was evicted, not this one
+        AlertPreference.objects.filter(user=self.user).update(notify_inapp=False)
+
+        self.client.put("/api/alerts/settings/", {"notify_email": False}, format="json")
+        self.assertEqual(
+            AlertPreference.objects.filter(user=self.user).values_list("notify_email", "notify_inapp").get(),
+            (False, False)
+        )
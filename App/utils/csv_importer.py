@@ -2,30 +2,36 @@
 import csv, io
 from .parsers import parse_price
 from .csv_mapping import CSV_FIELD_ALIASES
-from ..models import Product
+from django.db import DatabaseError, transaction
+from ..models import BULK_BATCH, Product, StockMovement
 from decimal import Decimal
 
+# Reverse index of CSV_FIELD_ALIASES: normalized header -> model field
+_ALIAS_TO_FIELD = {
+    alias.lower(): field
+    for field, aliases in CSV_FIELD_ALIASES.items()
+    for alias in aliases
+}
+
 def match_field(header_name):
     """Try to find which model field this header corresponds to."""
-    header_name = header_name.strip().lower()
-    for field, aliases in CSV_FIELD_ALIASES.items():
-        if header_name in aliases:
-            return field
-    return None  # Unrecognized column
+    return _ALIAS_TO_FIELD.get(header_name.strip().lower())  # None for unrecognized columns
 
 def import_products_from_csv(file, user):
-    decoded_file = file.read().decode('utf-8').splitlines()
-
-    if not decoded_file or len(decoded_file) < 2:
-        return {"status": "error", "message": "CSV file is empty or missing headers."}
+    # Decode lazily, one row at a time, instead of holding the whole upload
+    # as bytes, str and a list of lines
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8', newline=''))
 
-    reader = csv.DictReader(decoded_file)
+    try:
+        fieldnames = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as e:
+        return {"status": "error", "message": f"Could not read CSV file: {e}"}
 
-    if not reader.fieldnames:
-        return {"status": "error", "message": "No headers detected in CSV file."}
+    if not fieldnames:
+        return {"status": "error", "message": "CSV file is empty or missing headers."}
 
     header_map = {}
-    for h in reader.fieldnames:
+    for h in fieldnames:
         matched = match_field(h)
         if matched:
             header_map[h] = matched
@@ -34,32 +40,133 @@ def import_products_from_csv(file, user):
         return {"status": "error", "message": "No recognizable headers found in CSV."}
 
     required_fields = ["name", "sku", "stock", "unit_price"]
-    created = []
-    errors = []
+    pending = []  # (row_index, unsaved Product), flushed every BULK_BATCH rows
+    seen_skus = set()
+    errors = []  # (row_index, message)
+    created = 0
 
-    for row_index, row in enumerate(reader, start=1):
+    row_index = 0
+    for row_index, row in _read_rows(reader, errors):
         product_data = {}
         for csv_field, model_field in header_map.items():
-            value = row.get(csv_field, "").strip() if row.get(csv_field) else None
-            product_data[model_field] = value
+            value = row.get(csv_field)
+            if value and value.strip():
+                product_data[model_field] = value.strip()  # empty cells keep the model default
 
         missing = [f for f in required_fields if not product_data.get(f)]
         if missing:
-            errors.append(f"Row {row_index}: Missing required fields: {', '.join(missing)}")
+            errors.append((row_index, f"Missing required fields: {', '.join(missing)}"))
             continue
 
         try:
-            product_data["stock"] = int(product_data.get("stock", 0))
-            product_data["unit_price"] = parse_price(product_data.get("unit_price", "0"))
+            product_data["stock"] = int(product_data["stock"])
+            product_data["unit_price"] = parse_price(product_data["unit_price"])
+            if "reorder_level" in product_data:
+                product_data["reorder_level"] = int(product_data["reorder_level"])
         except ValueError as e:
-            errors.append(f"Row {row_index}: {e}")
+            errors.append((row_index, str(e)))
             continue
 
-        try:
-            product = Product.objects.create(**product_data, user=user)
-            created.append(product)
-        except Exception as e:
-            errors.append(f"Row {row_index}: {str(e)}")
+        if product_data["sku"] in seen_skus:
+            errors.append((row_index, f"Duplicate SKU '{product_data['sku']}' in file"))
+            continue
+        seen_skus.add(product_data["sku"])
+        pending.append((row_index, Product(**product_data, user=user)))
+
+        # Write as we read, so memory stays bounded by one batch however large the file
+        if len(pending) >= BULK_BATCH:
+            created += _import_batch(pending, user, errors)
+            pending = []
+
+    if row_index == 0 and not errors:
+        return {"status": "error", "message": "CSV file is empty or missing headers."}
+
+    if pending:
+        created += _import_batch(pending, user, errors)
 
     status = "success" if not errors else "partial"
-    return {"status": status, "created": len(created), "errors": errors}
+    return {
+        "status": status,
+        "created": created,
+        "errors": [f"Row {row_index}: {message}" for row_index, message in sorted(errors)],
+    }
+
+
+def _read_rows(reader, errors):
+    """
+    Yield (row_index, row) up to the end of the file or the first row that
+    cannot be decoded or parsed.
+
+    Batches are written while the file is read, so a bad row must not turn
+    into a 500 after earlier rows were committed: it is reported in errors
+    and reading stops, leaving the response's created count accurate. Bytes
+    are decoded in blocks, so a decode error surfaces at the first row of
+    the block that contains it.
+    """
+    row_index = 0
+    try:
+        for row_index, row in enumerate(reader, start=1):
+            yield row_index, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        errors.append((row_index + 1, f"Could not read the file from this row on, nothing after it was imported: {e}"))
+
+
+def _import_batch(pending, user, errors):
+    """
+    Store one batch of parsed rows and return how many products were created.
+
+    Costs one lookup for SKUs that already exist (instead of a failed INSERT
+    per row), one bulk INSERT, and one INSERT of the opening-stock movements.
+    """
+    existing = set(
+        Product.objects.filter(sku__in=[product.sku for _, product in pending]).values_list('sku', flat=True)
+    )
+
+    to_create = []
+    for row_index, product in pending:
+        if product.sku in existing:
+            errors.append((row_index, f"SKU '{product.sku}' already exists"))
+        else:
+            to_create.append((row_index, product))
+
+    created = _create_batch(to_create, errors) if to_create else []
+
+    # Record opening stock of imported tracked products
+    StockMovement.bulk_log([
+        StockMovement(
+            product=product,
+            delta=product.stock,
+            resulting_stock=product.stock,
+            performed_by=user,
+            reason="CSV import",
+            movement_type='IMPORT'
+        )
+        for product in created
+        if product.is_tracked() and product.stock
+    ])
+    return len(created)
+
+
+def _create_batch(batch, errors):
+    """
+    Insert a batch of (row_index, Product) with one bulk INSERT.
+
+    If the database rejects the batch (e.g. a SKU taken concurrently or an
+    over-long value), fall back to row-by-row inserts so only the offending
+    rows are reported in errors.
+    """
+    try:
+        with transaction.atomic():
+            return Product.objects.bulk_create([product for _, product in batch])
+    except DatabaseError:
+        pass
+
+    created = []
+    for row_index, product in batch:
+        try:
+            with transaction.atomic():
+                product.save(force_insert=True)
+            created.append(product)
+        except DatabaseError as e:
+            errors.append((row_index, str(e)))
+    return created
@@ -1,25 +1,33 @@
-from rest_framework.views import exception_handler
+import logging
+
+from rest_framework.views import exception_handler, set_rollback
 from rest_framework.response import Response
 from rest_framework import status
 
+logger = logging.getLogger(__name__)
+
 def custom_exception_handler(exc, context):
     # Get default error response
     response = exception_handler(exc, context)
 
-    if response is not None:
-        # Normalize DRF default errors
-        detail = response.data.get('detail', None)
-        message = detail if detail else response.data
-        response.data = {
+    if response is None:
+        # Handle other unhandled exceptions (e.g., ValueError). Answering here
+        # skips Django's own error logging and request rollback, so do both
+        logger.exception("Unhandled error in %s", context['view'].__class__.__name__)
+        set_rollback()
+        return Response({
             'error': True,
-            'message': message,
-            'status_code': response.status_code
-        }
-        return response
+            'message': str(exc) or "An unexpected error occurred.",
+            'status_code': status.HTTP_500_INTERNAL_SERVER_ERROR
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # Handle other unhandled exceptions (e.g., ValueError)
-    return Response({
+    # Normalize DRF default errors; list-shaped errors (e.g. many=True
+    # validation) have no 'detail' key and are passed through as the message
+    data = response.data
+    detail = data.get('detail') if isinstance(data, dict) else None
+    response.data = {
         'error': True,
-        'message': str(exc) or "An unexpected error occurred.",
-        'status_code': status.HTTP_500_INTERNAL_SERVER_ERROR
-    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        'message': detail if detail else data,
+        'status_code': response.status_code
+    }
+    return response
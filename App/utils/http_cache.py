@@ -0,0 +1,53 @@
+# utils/http_cache.py
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def versioned_list_response(request, queryset, render):
+    """
+    Serve a list endpoint from cache, keyed by a cheap version of its rows.
+
+    The version is the row count plus the latest updated_at, so any write
+    (every write path bumps updated_at) or delete yields a new key and stale
+    entries simply age out. `render` builds the (unrendered) Response on a
+    miss; its data and headers, such as pagination links, are cached.
+    Clients revalidating with If-None-Match get a bodyless 304.
+
+    JSON responses are cached as rendered bytes, so a hit skips both the
+    serializer and the renderer; other formats (the browsable API) cache
+    the data and render it per request.
+    """
+    renderer = request.accepted_renderer
+    version = queryset.aggregate(rows=Count('pk'), last=Max('updated_at'))
+    last = version['last'].timestamp() if version['last'] else 0
+    key = 'list:%s:%s:%s:%s:%s:%s' % (
+        request.user.pk, version['rows'], last, renderer.format, request.get_host(), request.get_full_path()
+    )
+    etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    cached = cache.get(key)
+    if cached is None:
+        response = render()
+        body = response.data
+        if renderer.format == 'json':
+            body = renderer.render(body, request.accepted_media_type, {'request': request})
+        # Content-Type is decided when the response is rendered, not cached
+        headers = {name: value for name, value in response.items() if name != 'Content-Type'}
+        cached = (body, headers)
+        cache.set(key, cached, settings.PHARMACY_LIST_CACHE_TTL)
+
+    body, headers = cached
+    headers = {**headers, 'ETag': etag}
+    if renderer.format != 'json':
+        return Response(body, headers=headers)
+    return HttpResponse(body, content_type=renderer.media_type, headers=headers)
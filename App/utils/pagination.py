@@ -0,0 +1,54 @@
+# utils/pagination.py
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+
+
+class HeaderLinkPagination:
+    """
+    Keeps the bare JSON list body clients already parse; page links travel
+    in an RFC 8288 Link header (rel="next" / rel="prev") instead.
+    """
+
+    def get_page_headers(self):
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for rel, url in (('next', self.get_next_link()), ('prev', self.get_previous_link()))
+            if url
+        ]
+        return {'Link': ', '.join(links)} if links else {}
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.get_page_headers())
+
+
+class ProductPagination(HeaderLinkPagination, LimitOffsetPagination):
+    """Product list pages; keeps the ?limit=&offset= parameters clients already send."""
+    default_limit = 100
+    max_limit = 500
+
+    def get_page_headers(self):
+        return {**super().get_page_headers(), 'X-Total-Count': str(self.count)}
+
+
+class SalePagination(HeaderLinkPagination, CursorPagination):
+    """
+    Newest sales first. A cursor seeks on the timestamp index instead of
+    scanning past OFFSET rows, so deep pages stay as cheap as the first one.
+    The id tie-breaker keeps sales sharing a timestamp in a stable order.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 500
+
+
+class StockMovementPagination(SalePagination):
+    """Newest movements first; same cursor and ?limit= rules as sales."""
+
+
+class AlertHistoryPagination(CursorPagination):
+    """Newest alerts first, seeking on the triggered_at index."""
+    ordering = ('-triggered_at', '-id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 500
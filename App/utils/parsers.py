@@ -2,7 +2,9 @@
 import re
 from decimal import Decimal, InvalidOperation
 
-CURRENCY_SYMBOLS = ["₵", "$", "¢", "€", "£", "ghc", "gh₵", "usd", "eur", "gbp"]
+# Anything that is not a digit or a dot: currency symbols and codes ("₵", "$",
+# "GHC", "usd", ...), thousands separators and whitespace
+_NON_NUMERIC = re.compile(r"[^0-9.]")
 
 def parse_price(value: str):
     """
@@ -12,15 +14,8 @@ def parse_price(value: str):
     if not value:
         raise ValueError("Empty price value")
 
-    # Normalize the string (lowercase and strip spaces)
-    value = value.strip().lower()
-
-    # Remove any known currency symbols or codes
-    for symbol in CURRENCY_SYMBOLS:
-        value = value.replace(symbol.lower(), "")
-
-    # Remove non-numeric and non-dot characters (like commas, spaces)
-    value = re.sub(r"[^0-9.]", "", value)
+    # Strip currency markers, commas and spaces in a single pass
+    value = _NON_NUMERIC.sub("", value)
 
     # Handle cases like "2.500.0"
     if value.count('.') > 1:
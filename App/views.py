@@ -4,10 +4,10 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
-from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, StockMovementSerializer, SaleSerializer, LowStockAlertSerializer, AlertPreferenceSerializer
-from .models import Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference
+from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, StockMovementSerializer, SaleSerializer, LowStockAlertSerializer, AlertPreferenceSerializer, AcknowledgeAlertsSerializer
+from .models import BULK_BATCH, Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference
 from rest_framework import generics, permissions, status
-from django.db import transaction, models
+from django.db import IntegrityError, transaction, models
 from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
 from django.db.models import Sum, Count, Q, F
 from rest_framework.parsers import MultiPartParser
@@ -17,14 +17,16 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, parser_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView
-from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, StockMovementSerializer, SaleSerializer, LowStockAlertSerializer, AlertPreferenceSerializer
-from .models import Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference
+from .serializers import RegisterSerializer, LoginSerializer, ProductSerializer, StockMovementSerializer, SaleSerializer, LowStockAlertSerializer, AlertPreferenceSerializer, AcknowledgeAlertsSerializer
+from .models import BULK_BATCH, Product, StockMovement, Sale, SaleItem, LowStockAlert, AlertPreference
 from rest_framework import generics, permissions, status
-from django.db import transaction, models
+from django.db import IntegrityError, transaction, models
 from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
 from django.db.models import Sum, Count, Q, F
 from rest_framework.parsers import MultiPartParser
 from .utils.csv_importer import import_products_from_csv
+from .utils.pagination import AlertHistoryPagination, ProductPagination, SalePagination, StockMovementPagination
+from .utils.http_cache import versioned_list_response
 from decimal import Decimal
 
 
@@ -48,7 +50,7 @@ def register_user(request):
     serializer.is_valid(raise_exception=True)
 
     user = serializer.save()
-    token = Token.objects.get(user=user)
+    token = user.auth_token  # cached by RegisterSerializer.create, no extra query
 
     return Response({
         "token": token.key,
@@ -70,8 +72,16 @@ def login_user(request):
         password = serializer.validated_data['password']
         user = authenticate(username=username, password=password)
         if user:
-            token, _ = Token.objects.get_or_create(user=user)
-            return Response({'token': token.key, 'username': user.username})
+            # One narrow SELECT when a token exists; otherwise a single INSERT,
+            # reading back the winner's key if a concurrent login created it first
+            key = Token.objects.filter(user=user).values_list('key', flat=True).first()
+            if key is None:
+                try:
+                    with transaction.atomic():
+                        key = Token.objects.create(user=user).key
+                except IntegrityError:
+                    key = Token.objects.values_list('key', flat=True).get(user=user)
+            return Response({'token': key, 'username': user.username})
         return Response({'error': 'Invalid credentials'}, status=400)
     return Response(serializer.errors, status=400)
 
@@ -92,7 +102,8 @@ def dashboard_summary(request):
     IMPORTANT: Proactively creates alerts for products with current low stock
     to ensure alerts appear immediately when a product first falls below reorder_level.
     """
-    from datetime import date, datetime, timedelta
+    from datetime import date, datetime, time, timedelta
+    from django.utils import timezone
     
     today = date.today()
     user = request.user
@@ -106,19 +117,23 @@ def dashboard_summary(request):
         reorder_level__gt=0,
         is_volatile=False  # Only tracked products
     )
-    for product in low_stock_products:
+    # Stream the products so a large catalogue is never held in memory at once
+    for product in low_stock_products.iterator(chunk_size=2000):
         LowStockAlert.create_or_update_for_product(product)
     
-    # Sales today - get aggregated data without full records
+    # Sales today - get aggregated data without full records. A half-open
+    # range on the raw column lets the timestamp index serve it
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
     today_sales = Sale.objects.filter(
-        timestamp__date=today
+        timestamp__gte=day_start,
+        timestamp__lt=day_start + timedelta(days=1)
     )
     sales_count = today_sales.count()
     today_revenue = today_sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
     
     # Recent sales (last 5 for display)
     recent_sales_list = SaleSerializer(
-        today_sales.order_by('-timestamp')[:5],
+        SaleSerializer.setup_eager_loading(today_sales).order_by('-timestamp')[:5],
         many=True
     ).data
     
@@ -131,21 +146,21 @@ def dashboard_summary(request):
     ).count()
     
     # Recent stock movements (last 5 only)
-    recent_movements = StockMovement.objects.filter(
+    recent_movements = StockMovementSerializer.setup_eager_loading(StockMovement.objects.filter(
         product__user=user
-    ).select_related('product').order_by('-timestamp')[:5]
+    )).order_by('-timestamp')[:5]
     recent_movements_data = StockMovementSerializer(recent_movements, many=True).data
     
     # Critical unread alerts (last 3 only)
     # IMPORTANT: Only show alerts for products that CURRENTLY have low stock.
     # This prevents stale alerts from showing up after restocking.
     from django.db.models import Q
-    critical_alerts = LowStockAlert.objects.filter(
+    critical_alerts = LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
         product__user=user,
         severity='critical',
         acknowledged=False,
         product__stock__lt=models.F('product__reorder_level')  # Validate stock is still low
-    ).select_related('product').order_by('-triggered_at')[:3]
+    )).order_by('-triggered_at')[:3]
     critical_alerts_data = LowStockAlertSerializer(critical_alerts, many=True).data
     
     return Response({
@@ -268,13 +283,9 @@ class SaleBatchSyncView(generics.GenericAPIView):
             external_id = sale_data.get('external_id')
  
             # Fast idempotency check before hitting the serializer
-            if external_id:
-                try:
-                    Sale.objects.get(external_id=external_id)
-                    duplicate += 1
-                    continue
-                except Sale.DoesNotExist:
-                    pass
+            if external_id and Sale.objects.filter(external_id=external_id).exists():
+                duplicate += 1
+                continue
  
             serializer = SaleSerializer(
                 data=sale_data,
@@ -320,11 +331,21 @@ class SaleBatchSyncView(generics.GenericAPIView):
 class ProductListCreateView(generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProductPagination
 
     def get_queryset(self):
-        limit = int(self.request.query_params.get('limit', 100))
-        offset = int(self.request.query_params.get('offset', 0))
-        return Product.objects.filter(user=self.request.user).select_related('user').order_by('id')[offset:offset + limit]
+        # ProductSerializer renders user as a pk and no reverse relations,
+        # so there is nothing to join or prefetch
+        return Product.objects.filter(user=self.request.user).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        # Unchanged pages are served from cache (or as a 304) without re-serializing
+        render = super().list
+        return versioned_list_response(
+            request,
+            Product.objects.filter(user=request.user),
+            lambda: render(request, *args, **kwargs)
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -348,12 +369,13 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class StockMovementCreateView(generics.ListCreateAPIView):
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StockMovementPagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return StockMovement.objects.filter(
+        # StockMovementPagination orders by -timestamp and caps the page size
+        return StockMovementSerializer.setup_eager_loading(StockMovement.objects.filter(
             product__user=self.request.user
-        ).select_related('product', 'performed_by').order_by('-timestamp')[:int(limit)]
+        ))
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -361,12 +383,14 @@ class StockMovementCreateView(generics.ListCreateAPIView):
         delta = serializer.validated_data['delta']
         reason = serializer.validated_data.get('reason')
 
-        if product.user != self.request.user:
+        # Compare ids: product.user would fetch the owner row just for this check
+        if product.user_id != self.request.user.pk:
             raise PermissionError("You do not own this product.")
 
         if product.is_volatile:
             raise ValueError("Stock movements are not allowed for volatile products.")
 
+        # adjust_stock() refreshes low-stock alerts once this transaction commits
         product.adjust_stock(
             qty_delta=delta,
             by_user=self.request.user,
@@ -374,9 +398,6 @@ class StockMovementCreateView(generics.ListCreateAPIView):
             movement_type='RESTOCK' if delta > 0 else 'ADJUSTMENT'
         )
 
-        # Immediately refresh low-stock alerts after any stock change
-        LowStockAlert.create_or_update_for_product(product)
-
 
 class SaleCreateView(generics.ListCreateAPIView):
     """
@@ -397,10 +418,11 @@ class SaleCreateView(generics.ListCreateAPIView):
     """
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SalePagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return Sale.objects.all().order_by('-timestamp')[:int(limit)]
+        # SalePagination orders by -timestamp and caps the page size
+        return SaleSerializer.setup_eager_loading(Sale.objects.filter(sold_by=self.request.user))
 
     def perform_create(self, serializer):
         serializer.save()
@@ -410,7 +432,8 @@ class SaleCreateView(generics.ListCreateAPIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def sales_by_date(request):
-    from datetime import datetime, date
+    from datetime import datetime, date, time, timedelta
+    from django.utils import timezone
 
     date_str = request.query_params.get('date')
     if date_str:
@@ -418,14 +441,21 @@ def sales_by_date(request):
     else:
         selected_date = date.today()
 
-    sales = Sale.objects.filter(timestamp__date=selected_date)
-    serializer = SaleSerializer(sales, many=True)
-    total = sales.aggregate(total_amount=Sum('total_amount'))['total_amount'] or 0
+    # Half-open [start, end) range on the raw column so the (sold_by, timestamp)
+    # index is range-scanned; timestamp__date would wrap the column in a cast
+    day_start = timezone.make_aware(datetime.combine(selected_date, time.min))
+    sales = Sale.objects.filter(
+        sold_by=request.user,
+        timestamp__gte=day_start,
+        timestamp__lt=day_start + timedelta(days=1)
+    )
+    serializer = SaleSerializer(SaleSerializer.setup_eager_loading(sales), many=True)
+    totals = sales.aggregate(total_amount=Sum('total_amount'), transactions=Count('id'))
     return Response([
     {
         "date": str(selected_date),
-        "total": total,
-        "transactions": sales.count(),
+        "total": totals['total_amount'] or 0,
+        "transactions": totals['transactions'],
         "sales": serializer.data
     }
 ])
@@ -532,27 +562,8 @@ def product_sales_analytics(request):
         product=product,
         sale__timestamp__date__gte=start_date,
         sale__timestamp__date__lte=end_date
-    ).select_related('sale')
-    
-    if not sale_items.exists():
-        return Response({
-            "product": ProductSerializer(product).data,
-            "total_quantity_sold": 0,
-            "total_revenue": Decimal('0.00'),
-            "average_unit_price": Decimal('0.00'),
-            "period_breakdown": []
-        })
-    
-    # Aggregate totals
-    totals = sale_items.aggregate(
-        total_qty=Sum('quantity'),
-        total_revenue=Sum('subtotal'),
     )
     
-    total_qty = totals['total_qty'] or Decimal('0')
-    total_revenue = totals['total_revenue'] or Decimal('0.00')
-    avg_price = (total_revenue / total_qty) if total_qty > 0 else Decimal('0.00')
-    
     # Period breakdown
     if period == "daily":
         trunc_func = TruncDate
@@ -561,7 +572,8 @@ def product_sales_analytics(request):
     else:
         trunc_func = TruncWeek
     
-    period_data = (
+    # One grouped query; the overall totals are summed from its (few) period rows
+    period_data = list(
         sale_items
         .annotate(period=trunc_func('sale__timestamp'))
         .values('period')
@@ -572,6 +584,19 @@ def product_sales_analytics(request):
         .order_by('period')
     )
     
+    if not period_data:
+        return Response({
+            "product": ProductSerializer(product).data,
+            "total_quantity_sold": 0,
+            "total_revenue": Decimal('0.00'),
+            "average_unit_price": Decimal('0.00'),
+            "period_breakdown": []
+        })
+    
+    total_qty = sum((p['qty'] for p in period_data), Decimal('0'))
+    total_revenue = sum((p['revenue'] for p in period_data), Decimal('0.00'))
+    avg_price = (total_revenue / total_qty) if total_qty > 0 else Decimal('0.00')
+    
     period_breakdown = [
         {
             "date": str(p['period']),
@@ -595,44 +620,45 @@ class LowStockAlertListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Show alerts created for the logged-in user
-        return LowStockAlert.objects.filter(
+        return LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
             product__user=self.request.user,
             acknowledged=False
-        ).select_related('product')
+        ))
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        # Every listed alert is unacknowledged, so both counts come from the fetched rows
+        alerts = list(self.get_queryset())
+        serializer = self.get_serializer(alerts, many=True)
         return Response({
             "alerts": serializer.data,
-            "unread_count": queryset.filter(acknowledged=False).count(),
-            "critical_count": queryset.filter(severity='critical').count()
+            "unread_count": len(alerts),
+            "critical_count": sum(1 for alert in alerts if alert.severity == 'critical')
         })
 
 
 class AlertHistoryView(generics.ListAPIView):
     serializer_class = LowStockAlertSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AlertHistoryPagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return LowStockAlert.objects.filter(
+        return LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
             product__user=self.request.user
-        ).select_related('product').order_by('-triggered_at')[:int(limit)]
+        ))
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        # Counts cover the whole history, not just the returned page, in one query
+        counts = LowStockAlert.objects.filter(product__user=request.user).aggregate(
+            unread_count=Count('id', filter=Q(acknowledged=False)),
+            critical_count=Count('id', filter=Q(severity='critical'))
+        )
         return Response({
             "alerts": serializer.data,
-            "unread_count": LowStockAlert.objects.filter(
-                product__user=request.user,
-                acknowledged=False
-            ).count(),
-            "critical_count": LowStockAlert.objects.filter(
-                product__user=request.user,
-                severity='critical'
-            ).count()
+            **counts,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link()
         })
 
 # POST /api/alerts/acknowledge/
@@ -640,8 +666,18 @@ class AcknowledgeAlertView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        alert_ids = request.data.get('alert_ids', [])
-        updated = LowStockAlert.objects.filter(id__in=alert_ids, product__user=request.user).update(acknowledged=True)
+        serializer = AcknowledgeAlertsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        alert_ids = sorted(set(serializer.validated_data['alert_ids']))
+
+        # Bounded IN lists keep each UPDATE's plan and lock footprint predictable
+        updated = 0
+        for i in range(0, len(alert_ids), BULK_BATCH):
+            updated += LowStockAlert.objects.filter(
+                id__in=alert_ids[i:i + BULK_BATCH],
+                product__user=request.user,
+                acknowledged=False
+            ).update(acknowledged=True)
         return Response({"message": f"{updated} alerts acknowledged."})
 
 
@@ -663,11 +699,13 @@ class AlertSettingsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        pref, _ = AlertPreference.objects.get_or_create(user=request.user)
+        pref = AlertPreference.for_user(request.user)
         serializer = AlertPreferenceSerializer(pref)
         return Response(serializer.data)
 
     def put(self, request):
+        # Partial updates save every field, so start from the row rather than
+        # a cached copy that may predate another worker's change
         pref, _ = AlertPreference.objects.get_or_create(user=request.user)
         serializer = AlertPreferenceSerializer(pref, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
@@ -675,6 +713,8 @@ class AlertSettingsView(APIView):
         return Response(serializer.data)
 
 from .utils.csv_importer import import_products_from_csv
+from .utils.pagination import AlertHistoryPagination, ProductPagination, SalePagination, StockMovementPagination
+from .utils.http_cache import versioned_list_response
 from decimal import Decimal
 
 
@@ -698,7 +738,7 @@ def register_user(request):
     serializer.is_valid(raise_exception=True)
 
     user = serializer.save()
-    token = Token.objects.get(user=user)
+    token = user.auth_token  # cached by RegisterSerializer.create, no extra query
 
     return Response({
         "token": token.key,
@@ -720,8 +760,16 @@ def login_user(request):
         password = serializer.validated_data['password']
         user = authenticate(username=username, password=password)
         if user:
-            token, _ = Token.objects.get_or_create(user=user)
-            return Response({'token': token.key, 'username': user.username})
+            # One narrow SELECT when a token exists; otherwise a single INSERT,
+            # reading back the winner's key if a concurrent login created it first
+            key = Token.objects.filter(user=user).values_list('key', flat=True).first()
+            if key is None:
+                try:
+                    with transaction.atomic():
+                        key = Token.objects.create(user=user).key
+                except IntegrityError:
+                    key = Token.objects.values_list('key', flat=True).get(user=user)
+            return Response({'token': key, 'username': user.username})
         return Response({'error': 'Invalid credentials'}, status=400)
     return Response(serializer.errors, status=400)
 
@@ -742,7 +790,8 @@ def dashboard_summary(request):
     IMPORTANT: Proactively creates alerts for products with current low stock
     to ensure alerts appear immediately when a product first falls below reorder_level.
     """
-    from datetime import date, datetime, timedelta
+    from datetime import date, datetime, time, timedelta
+    from django.utils import timezone
     
     today = date.today()
     user = request.user
@@ -756,19 +805,23 @@ def dashboard_summary(request):
         reorder_level__gt=0,
         is_volatile=False  # Only tracked products
     )
-    for product in low_stock_products:
+    # Stream the products so a large catalogue is never held in memory at once
+    for product in low_stock_products.iterator(chunk_size=2000):
         LowStockAlert.create_or_update_for_product(product)
     
-    # Sales today - get aggregated data without full records
+    # Sales today - get aggregated data without full records. A half-open
+    # range on the raw column lets the timestamp index serve it
+    day_start = timezone.make_aware(datetime.combine(today, time.min))
     today_sales = Sale.objects.filter(
-        timestamp__date=today
+        timestamp__gte=day_start,
+        timestamp__lt=day_start + timedelta(days=1)
     )
     sales_count = today_sales.count()
     today_revenue = today_sales.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
     
     # Recent sales (last 5 for display)
     recent_sales_list = SaleSerializer(
-        today_sales.order_by('-timestamp')[:5],
+        SaleSerializer.setup_eager_loading(today_sales).order_by('-timestamp')[:5],
         many=True
     ).data
     
@@ -781,21 +834,21 @@ def dashboard_summary(request):
     ).count()
     
     # Recent stock movements (last 5 only)
-    recent_movements = StockMovement.objects.filter(
+    recent_movements = StockMovementSerializer.setup_eager_loading(StockMovement.objects.filter(
         product__user=user
-    ).select_related('product').order_by('-timestamp')[:5]
+    )).order_by('-timestamp')[:5]
     recent_movements_data = StockMovementSerializer(recent_movements, many=True).data
     
     # Critical unread alerts (last 3 only)
     # IMPORTANT: Only show alerts for products that CURRENTLY have low stock.
     # This prevents stale alerts from showing up after restocking.
     from django.db.models import Q
-    critical_alerts = LowStockAlert.objects.filter(
+    critical_alerts = LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
         product__user=user,
         severity='critical',
         acknowledged=False,
         product__stock__lt=models.F('product__reorder_level')  # Validate stock is still low
-    ).select_related('product').order_by('-triggered_at')[:3]
+    )).order_by('-triggered_at')[:3]
     critical_alerts_data = LowStockAlertSerializer(critical_alerts, many=True).data
     
     return Response({
@@ -813,11 +866,21 @@ def dashboard_summary(request):
 class ProductListCreateView(generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ProductPagination
 
     def get_queryset(self):
-        limit = int(self.request.query_params.get('limit', 100))
-        offset = int(self.request.query_params.get('offset', 0))
-        return Product.objects.select_related('user').order_by('id')[offset:offset + limit]
+        # ProductSerializer renders user as a pk and no reverse relations,
+        # so there is nothing to join or prefetch
+        return Product.objects.filter(user=self.request.user).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        # Unchanged pages are served from cache (or as a 304) without re-serializing
+        render = super().list
+        return versioned_list_response(
+            request,
+            Product.objects.filter(user=request.user),
+            lambda: render(request, *args, **kwargs)
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -830,7 +893,7 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         # restrict to products owned by requesting user
-        return Product.objects.all()
+        return Product.objects.filter(user=self.request.user)
 
     def perform_update(self, serializer):
         # Ensure the owner remains the same (user is read-only in serializer)
@@ -841,12 +904,13 @@ class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class StockMovementCreateView(generics.ListCreateAPIView):
     serializer_class = StockMovementSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StockMovementPagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return StockMovement.objects.filter(
+        # StockMovementPagination orders by -timestamp and caps the page size
+        return StockMovementSerializer.setup_eager_loading(StockMovement.objects.filter(
             product__user=self.request.user
-        ).select_related('product', 'performed_by').order_by('-timestamp')[:int(limit)]
+        ))
 
     @transaction.atomic
     def perform_create(self, serializer):
@@ -854,12 +918,14 @@ class StockMovementCreateView(generics.ListCreateAPIView):
         delta = serializer.validated_data['delta']
         reason = serializer.validated_data.get('reason')
 
-        if product.user != self.request.user:
+        # Compare ids: product.user would fetch the owner row just for this check
+        if product.user_id != self.request.user.pk:
             raise PermissionError("You do not own this product.")
 
         if product.is_volatile:
             raise ValueError("Stock movements are not allowed for volatile products.")
 
+        # adjust_stock() refreshes low-stock alerts once this transaction commits
         product.adjust_stock(
             qty_delta=delta,
             by_user=self.request.user,
@@ -867,9 +933,6 @@ class StockMovementCreateView(generics.ListCreateAPIView):
             movement_type='RESTOCK' if delta > 0 else 'ADJUSTMENT'
         )
 
-        # Immediately refresh low-stock alerts after any stock change
-        LowStockAlert.create_or_update_for_product(product)
-
 
 class SaleCreateView(generics.ListCreateAPIView):
     """
@@ -890,10 +953,11 @@ class SaleCreateView(generics.ListCreateAPIView):
     """
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SalePagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return Sale.objects.all().order_by('-timestamp')[:int(limit)]
+        # SalePagination orders by -timestamp and caps the page size
+        return SaleSerializer.setup_eager_loading(Sale.objects.filter(sold_by=self.request.user))
 
     def perform_create(self, serializer):
         serializer.save()
@@ -903,7 +967,8 @@ class SaleCreateView(generics.ListCreateAPIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def sales_by_date(request):
-    from datetime import datetime, date
+    from datetime import datetime, date, time, timedelta
+    from django.utils import timezone
 
     date_str = request.query_params.get('date')
     if date_str:
@@ -911,14 +976,21 @@ def sales_by_date(request):
     else:
         selected_date = date.today()
 
-    sales = Sale.objects.filter(timestamp__date=selected_date)
-    serializer = SaleSerializer(sales, many=True)
-    total = sales.aggregate(total_amount=Sum('total_amount'))['total_amount'] or 0
+    # Half-open [start, end) range on the raw column so the (sold_by, timestamp)
+    # index is range-scanned; timestamp__date would wrap the column in a cast
+    day_start = timezone.make_aware(datetime.combine(selected_date, time.min))
+    sales = Sale.objects.filter(
+        sold_by=request.user,
+        timestamp__gte=day_start,
+        timestamp__lt=day_start + timedelta(days=1)
+    )
+    serializer = SaleSerializer(SaleSerializer.setup_eager_loading(sales), many=True)
+    totals = sales.aggregate(total_amount=Sum('total_amount'), transactions=Count('id'))
     return Response([
     {
         "date": str(selected_date),
-        "total": total,
-        "transactions": sales.count(),
+        "total": totals['total_amount'] or 0,
+        "transactions": totals['transactions'],
         "sales": serializer.data
     }
 ])
@@ -1025,27 +1097,8 @@ def product_sales_analytics(request):
         product=product,
         sale__timestamp__date__gte=start_date,
         sale__timestamp__date__lte=end_date
-    ).select_related('sale')
-    
-    if not sale_items.exists():
-        return Response({
-            "product": ProductSerializer(product).data,
-            "total_quantity_sold": 0,
-            "total_revenue": Decimal('0.00'),
-            "average_unit_price": Decimal('0.00'),
-            "period_breakdown": []
-        })
-    
-    # Aggregate totals
-    totals = sale_items.aggregate(
-        total_qty=Sum('quantity'),
-        total_revenue=Sum('subtotal'),
     )
     
-    total_qty = totals['total_qty'] or Decimal('0')
-    total_revenue = totals['total_revenue'] or Decimal('0.00')
-    avg_price = (total_revenue / total_qty) if total_qty > 0 else Decimal('0.00')
-    
     # Period breakdown
     if period == "daily":
         trunc_func = TruncDate
@@ -1054,7 +1107,8 @@ def product_sales_analytics(request):
     else:
         trunc_func = TruncWeek
     
-    period_data = (
+    # One grouped query; the overall totals are summed from its (few) period rows
+    period_data = list(
         sale_items
         .annotate(period=trunc_func('sale__timestamp'))
         .values('period')
@@ -1065,6 +1119,19 @@ def product_sales_analytics(request):
         .order_by('period')
     )
     
+    if not period_data:
+        return Response({
+            "product": ProductSerializer(product).data,
+            "total_quantity_sold": 0,
+            "total_revenue": Decimal('0.00'),
+            "average_unit_price": Decimal('0.00'),
+            "period_breakdown": []
+        })
+    
+    total_qty = sum((p['qty'] for p in period_data), Decimal('0'))
+    total_revenue = sum((p['revenue'] for p in period_data), Decimal('0.00'))
+    avg_price = (total_revenue / total_qty) if total_qty > 0 else Decimal('0.00')
+    
     period_breakdown = [
         {
             "date": str(p['period']),
@@ -1088,44 +1155,45 @@ class LowStockAlertListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Show alerts created for the logged-in user
-        return LowStockAlert.objects.filter(
+        return LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
             product__user=self.request.user,
             acknowledged=False
-        ).select_related('product')
+        ))
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        # Every listed alert is unacknowledged, so both counts come from the fetched rows
+        alerts = list(self.get_queryset())
+        serializer = self.get_serializer(alerts, many=True)
         return Response({
             "alerts": serializer.data,
-            "unread_count": queryset.filter(acknowledged=False).count(),
-            "critical_count": queryset.filter(severity='critical').count()
+            "unread_count": len(alerts),
+            "critical_count": sum(1 for alert in alerts if alert.severity == 'critical')
         })
 
 
 class AlertHistoryView(generics.ListAPIView):
     serializer_class = LowStockAlertSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AlertHistoryPagination
 
     def get_queryset(self):
-        limit = self.request.query_params.get('limit', 50)
-        return LowStockAlert.objects.filter(
+        return LowStockAlertSerializer.setup_eager_loading(LowStockAlert.objects.filter(
             product__user=self.request.user
-        ).select_related('product').order_by('-triggered_at')[:int(limit)]
+        ))
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        # Counts cover the whole history, not just the returned page, in one query
+        counts = LowStockAlert.objects.filter(product__user=request.user).aggregate(
+            unread_count=Count('id', filter=Q(acknowledged=False)),
+            critical_count=Count('id', filter=Q(severity='critical'))
+        )
         return Response({
             "alerts": serializer.data,
-            "unread_count": LowStockAlert.objects.filter(
-                product__user=request.user,
-                acknowledged=False
-            ).count(),
-            "critical_count": LowStockAlert.objects.filter(
-                product__user=request.user,
-                severity='critical'
-            ).count()
+            **counts,
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link()
         })
 
 # POST /api/alerts/acknowledge/
@@ -1133,8 +1201,18 @@ class AcknowledgeAlertView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        alert_ids = request.data.get('alert_ids', [])
-        updated = LowStockAlert.objects.filter(id__in=alert_ids, product__user=request.user).update(acknowledged=True)
+        serializer = AcknowledgeAlertsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        alert_ids = sorted(set(serializer.validated_data['alert_ids']))
+
+        # Bounded IN lists keep each UPDATE's plan and lock footprint predictable
+        updated = 0
+        for i in range(0, len(alert_ids), BULK_BATCH):
+            updated += LowStockAlert.objects.filter(
+                id__in=alert_ids[i:i + BULK_BATCH],
+                product__user=request.user,
+                acknowledged=False
+            ).update(acknowledged=True)
         return Response({"message": f"{updated} alerts acknowledged."})
 
 
@@ -1156,11 +1234,13 @@ class AlertSettingsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        pref, _ = AlertPreference.objects.get_or_create(user=request.user)
+        pref = AlertPreference.for_user(request.user)
         serializer = AlertPreferenceSerializer(pref)
         return Response(serializer.data)
 
     def put(self, request):
+        # Partial updates save every field, so start from the row rather than
+        # a cached copy that may predate another worker's change
         pref, _ = AlertPreference.objects.get_or_create(user=request.user)
         serializer = AlertPreferenceSerializer(pref, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
@@ -33,6 +33,8 @@ ALLOWED_HOSTS = [
     '*',
 ]
 CORS_ALLOW_ALL_ORIGINS = True
+# List pagination links and the product total travel in response headers
+CORS_EXPOSE_HEADERS = ["Link", "X-Total-Count", "ETag"]
 
 # Application definition
 
@@ -86,11 +88,42 @@ WSGI_APPLICATION = "Base.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are reused across requests (DB_CONN_MAX_AGE seconds, 0 to close
+# after each request). Behind pgBouncer in transaction-pooling mode set
+# DB_DISABLE_SERVER_SIDE_CURSORS=1, since named cursors cannot outlive a transaction.
 DATABASES = {
     "default": dj_database_url.parse(
-        os.environ.get("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+        os.environ.get("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+        conn_max_age=int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+        conn_health_checks=True,
     )
 }
+DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = (
+    os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "") == "1"
+)
+
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # WAL lets API reads proceed while a sale is being written. IMMEDIATE
+    # transactions take the write lock up front, and writers wait up to 5s
+    # for it instead of failing with "database is locked". synchronous stays
+    # FULL so a committed sale or stock movement survives a power cut.
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=FULL;",
+        "transaction_mode": "IMMEDIATE",
+        "timeout": 5,
+    })
+
+# Rows per INSERT/UPDATE statement for bulk stock and alert writes
+PHARMACY_BULK_BATCH_SIZE = int(os.environ.get("PHARMACY_BULK_BATCH_SIZE", "500"))
+
+# Seconds a user's alert preferences stay in the cache. Saving evicts the entry,
+# but with the default per-process cache other workers may serve the old value
+# until it expires.
+PHARMACY_ALERT_PREF_CACHE_TTL = int(os.environ.get("PHARMACY_ALERT_PREF_CACHE_TTL", "300"))
+
+# Seconds a rendered product list page stays cached. Entries are keyed by a
+# version of the underlying rows, so writes never serve stale data.
+PHARMACY_LIST_CACHE_TTL = int(os.environ.get("PHARMACY_LIST_CACHE_TTL", "300"))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -99,6 +132,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ], 
+    'EXCEPTION_HANDLER': 'App.utils.exeptions.custom_exception_handler',
 }
 
 # Password validation
@@ -142,3 +176,23 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# App diagnostics (e.g. adjust_stock) are DEBUG-level and stay silent unless
+# APP_LOG_LEVEL=DEBUG is set.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "App": {
+            "handlers": ["console"],
+            "level": os.environ.get("APP_LOG_LEVEL", "INFO"),
+        },
+    },
+}